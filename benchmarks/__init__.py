@@ -0,0 +1,20 @@
+import math
+import time
+import tracemalloc
+
+
+async def measure(run, repeat: int = 5) -> tuple[float, int]:
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await run()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        await run()
+        return best, tracemalloc.get_traced_memory()[1]
+    finally: tracemalloc.stop()
+
+
+def report(name: str, items: int, elapsed: float, peak: int) -> None:
+    print(f"{name:<24} {items / elapsed:>14,.0f}/s {elapsed * 1000:>10.1f} ms {peak / 1024:>12,.0f} KiB allocated at peak")
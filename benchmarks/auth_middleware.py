@@ -0,0 +1,91 @@
+import asyncio
+import time
+from fnmatch import fnmatch
+from typing import Annotated
+from fastapi import Depends, FastAPI, HTTPException
+from jose import jwt
+from starlette.middleware.base import BaseHTTPMiddleware
+from benchmarks import measure, report
+from cache import create_cache_client
+from config import config
+from exceptions import UnauthorizedException
+from middleware.auth_middleware import AuthMiddleware
+from responses import AuthResponse
+from schemas.utils_schema import CurrentUser
+from utils import get_current_user
+
+REQUESTS = 5000
+
+
+class LegacyAuthMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, dispatch=None):
+        super().__init__(app, dispatch)
+        self.exclude_urls = ["/docs", "/api/v1/openapi.json", "/api/v1/auth/*"]
+        self.auth_scheme = config.AUTH_SCHEME
+
+    async def dispatch(self, request, call_next):
+        try:
+            response = await call_next(request)
+            if any(fnmatch(request.url.path, pattern) for pattern in self.exclude_urls): return response
+            token = await self.auth_scheme(request)
+            if not token: raise UnauthorizedException("Missing authentication token")
+            jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
+            return response
+        except HTTPException as e: return AuthResponse(str(e))
+
+
+async def legacy_current_user(token: Annotated[str, Depends(config.AUTH_SCHEME)]):
+    if not token: raise UnauthorizedException("Missing authentication token")
+    payload = jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
+    return CurrentUser(id=payload["sub"], host=payload.get("host"), domain=payload.get("domain"), role=payload.get("role"))
+
+
+def build_app(middleware, current_user) -> tuple[FastAPI, list]:
+    app = FastAPI()
+    app.state.cache = create_cache_client()
+    handled = []
+
+    @app.get("/api/v1/apps")
+    async def list_apps(user: Annotated[CurrentUser, Depends(current_user)]):
+        return {"id": user.id}
+
+    @app.get("/api/v1/media")
+    async def list_media():
+        handled.append(True)
+        return []
+
+    app.add_middleware(middleware)
+    return app, handled
+
+
+async def call(app: FastAPI, path: str, headers: list) -> int:
+    messages = []
+
+    async def receive(): return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message): messages.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": headers, "client": ("127.0.0.1", 1), "server": ("testserver", 80)}
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+async def run_requests(app: FastAPI, path: str, headers: list, expected: int) -> None:
+    for _ in range(REQUESTS):
+        if await call(app, path, headers) != expected: raise RuntimeError("Unexpected response status")
+
+
+async def main():
+    token = jwt.encode({"sub": "benchmark", "role": "user", "domain": "benchmark", "host": "benchmark.local", "exp": int(time.time()) + 3600}, config.JWT_SECRET, algorithm=config.JWT_ALGORITHM)
+    authorized = [(b"authorization", f"Bearer {token}".encode())]
+    for name, middleware, current_user in (("before", LegacyAuthMiddleware, legacy_current_user), ("after", AuthMiddleware, get_current_user)):
+        app, handled = build_app(middleware, current_user)
+        report(f"{name} authorized", REQUESTS, *await measure(lambda: run_requests(app, "/api/v1/apps", authorized, 200)))
+        report(f"{name} unauthorized", REQUESTS, *await measure(lambda: run_requests(app, "/api/v1/media", [], 401)))
+        handled.clear()
+        await run_requests(app, "/api/v1/media", [], 401)
+        print(f"{name} unauthorized requests that reached the handler: {len(handled)} of {REQUESTS}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+import asyncio
+from uuid import uuid4
+from sqlalchemy import delete
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from benchmarks import measure, report
+from database import async_session
+from models import App, Domain, Media, MediaTypeEnum, Role, RoleEnum, User, generate_uuid
+from schemas.media_schema import MediaResponse
+from services.helpers.pagination import next_page_cursor, paginate_by_created_at
+from services.media_service import MediaService
+
+MEDIA_ROWS = 10_000
+PAGE_SIZE = 1000
+INSERT_BATCH_SIZE = 1000
+
+
+async def seed(session) -> tuple[str, str]:
+    suffix = uuid4().hex[:12]
+    role = (await session.exec(select(Role).where(Role.name == RoleEnum.user))).first()
+    if role is None:
+        role = Role(name=RoleEnum.user)
+        session.add(role)
+    domain = Domain(name=f"benchmark-{suffix}", host=f"benchmark-{suffix}.local")
+    session.add(domain)
+    await session.flush()
+    app = App(name=f"benchmark-{suffix}", slug=f"benchmark-{suffix}", domain_id=domain.id)
+    user = User(username=f"benchmark-{suffix}", email=f"{suffix}@benchmark.local", phone=suffix, password="x", domain_id=domain.id, role_id=role.id)
+    session.add_all([app, user])
+    await session.flush()
+    for start in range(0, MEDIA_ROWS, INSERT_BATCH_SIZE):
+        session.add_all([Media(id=generate_uuid(), name=f"media-{index}", original_filename=f"media-{index}.jpg", file_key=f"benchmark/{suffix}/{index}.jpg", file_path=f"https://cdn.local/{suffix}/{index}.jpg", file_extension="jpg", file_size=1024, mime_type="image/jpeg", media_type=MediaTypeEnum.image, width=640, height=480, alt_text=f"alt {index}", caption=f"caption {index}", meta={"index": index}, app_id=app.id, uploaded_by_id=user.id) for index in range(start, min(start + INSERT_BATCH_SIZE, MEDIA_ROWS))])
+        await session.flush()
+    await session.commit()
+    return domain.id, app.id
+
+
+async def list_entities(session, service: MediaService, app_id: str) -> int:
+    count, cursor = 0, None
+    while True:
+        statement = select(Media).options(selectinload(Media.uploaded_by)).where(Media.app_id == app_id)
+        rows = (await session.exec(paginate_by_created_at(statement, Media.created_at, Media.id, PAGE_SIZE, cursor))).all()
+        items = [MediaResponse.from_model(media, await service.get_media_url(media)).model_dump() for media in rows[:PAGE_SIZE]]
+        count += len(items)
+        session.expunge_all()
+        cursor = next_page_cursor(rows, PAGE_SIZE)
+        if cursor is None: return count
+
+
+async def list_projected(service: MediaService, app_id: str, fields=None) -> int:
+    count, cursor = 0, None
+    while True:
+        items, cursor = await service.list_app_media(app_id, limit=PAGE_SIZE, cursor=cursor, **({"fields": fields} if fields else {}))
+        count += len(items)
+        if cursor is None: return count
+
+
+async def main():
+    async with async_session() as session:
+        domain_id, app_id = await seed(session)
+        try:
+            service = MediaService(session, None)
+            cases = [
+                ("orm entities", lambda: list_entities(session, service, app_id)),
+                ("projected rows", lambda: list_projected(service, app_id)),
+                ("projected id,name", lambda: list_projected(service, app_id, ("id", "name")))
+            ]
+            for name, run in cases: report(name, MEDIA_ROWS, *await measure(run))
+        finally:
+            await session.rollback()
+            await session.exec(delete(Domain).where(Domain.id == domain_id))
+            await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+import asyncio
+import statistics
+import time
+from config import config
+from services.user_service import UserService, password_executor
+
+LOGINS = 16
+PROBE_INTERVAL = 0.005
+PASSWORD = "benchmark-password"
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def verify_blocking(context, hashed: str) -> None:
+    context.verify_and_update(PASSWORD, hashed)
+
+
+async def verify_offloaded(context, hashed: str) -> None:
+    await asyncio.get_running_loop().run_in_executor(password_executor, context.verify_and_update, PASSWORD, hashed)
+
+
+async def login_burst(verify, context, hashed: str) -> tuple[list, list]:
+    logins, probes, done = [], [], asyncio.Event()
+
+    async def login(start: float):
+        await verify(context, hashed)
+        logins.append(time.perf_counter() - start)
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            probes.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+    prober = asyncio.create_task(probe())
+    await asyncio.sleep(PROBE_INTERVAL)
+    start = time.perf_counter()
+    await asyncio.gather(*(login(start) for _ in range(LOGINS)))
+    done.set()
+    await prober
+    return logins, probes
+
+
+async def main():
+    context = UserService().pwd_context
+    hashed = context.hash(PASSWORD)
+    print(f"bcrypt rounds {config.PASSWORD_HASH_ROUNDS}, {LOGINS} concurrent logins, {config.PASSWORD_HASH_MAX_CONCURRENCY} hashing threads")
+    for name, verify in (("before (on loop)", verify_blocking), ("after (executor)", verify_offloaded)):
+        start = time.perf_counter()
+        logins, probes = await login_burst(verify, context, hashed)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<24} {LOGINS / elapsed:>8.1f} logins/s  login p50 {statistics.median(logins) * 1000:>8.1f} ms  p99 {percentile(logins, 0.99) * 1000:>8.1f} ms  other requests p99 delay {percentile(probes, 0.99) * 1000:>8.1f} ms over {len(probes)} probes")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,29 +1,159 @@
+import asyncio
+import json
+import math
+import random
+import time
 from datetime import timedelta
+from typing import Any, Awaitable, Callable, Optional
 from fastapi import Request
-from redis import Redis
-from typing import Any, Callable, Optional, TypedDict
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 from sqlmodel import SQLModel
-import json
+from cache.memory import TTLCache
+from config import config
+from exceptions import ServiceUnavailableException
 
+FLAG_PURGE_MIN_ENTRIES = 1024
+
+class RedisCacheBackend:
+    shared = True
 
-class CacheClient:
     def __init__(self, redis: Redis):
         self.redis = redis
 
-    def set(self, key: str, value: Any, expire: Optional[timedelta] = timedelta(minutes=5)) -> None:
-        if isinstance(value, (str, int, float, bool)): data = str(value)
-        elif isinstance(value, (dict, list)): data = json.dumps(value)
-        elif isinstance(value, SQLModel): data = json.dumps(value.model_dump())
-        else: raise TypeError(f"Unsupported type for caching: {type(value)}")
-        self.redis.setex(key, expire, data)
+    async def get(self, key: str) -> Optional[str]:
+        try: return await self.redis.get(key)
+        except RedisError: return None
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None, only_if_missing: bool = False) -> None:
+        try: await self.redis.set(key, value, ex=ttl, nx=only_if_missing)
+        except RedisError: pass
+
+    async def incr(self, key: str) -> None:
+        try: await self.redis.incr(key)
+        except RedisError: pass
+
+    async def set_flag(self, key: str, ttl: Optional[float] = None) -> None:
+        try: await self.redis.set(key, "1", ex=max(1, math.ceil(ttl)) if ttl is not None else None)
+        except RedisError: raise ServiceUnavailableException(detail="Cache is unavailable")
+
+    async def has_flag(self, key: str) -> bool:
+        try: return bool(await self.redis.exists(key))
+        except RedisError: raise ServiceUnavailableException(detail="Cache is unavailable")
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+class MemoryCacheBackend:
+    shared = False
+
+    def __init__(self, max_entries: int):
+        self.entries = TTLCache(max_entries)
+        self.versions: dict[str, str] = {}
+        self.flags = TTLCache(math.inf)
+        self.flags_purge_at = FLAG_PURGE_MIN_ENTRIES
+
+    async def get(self, key: str) -> Optional[str]:
+        if key in self.versions: return self.versions[key]
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None, only_if_missing: bool = False) -> None:
+        if ttl is None:
+            if only_if_missing: self.versions.setdefault(key, value)
+            else: self.versions[key] = value
+        elif not only_if_missing or self.entries.get(key) is None: self.entries.set(key, value, ttl)
+
+    async def incr(self, key: str) -> None:
+        self.versions[key] = str(int(self.versions.get(key, 0)) + 1)
+
+    async def set_flag(self, key: str, ttl: Optional[float] = None) -> None:
+        if ttl is not None and ttl <= 0: return
+        self.flags.set(key, True, ttl)
+        if len(self.flags) < self.flags_purge_at: return
+        self.flags.purge_expired()
+        self.flags_purge_at = max(FLAG_PURGE_MIN_ENTRIES, len(self.flags) * 2)
+
+    async def has_flag(self, key: str) -> bool:
+        return self.flags.get(key, False)
 
-    def get(self, key: str) -> Any:
-        data = self.redis.get(key)
+    async def close(self) -> None:
+        self.entries.clear()
+
+
+class CacheClient:
+    def __init__(self, backend: RedisCacheBackend | MemoryCacheBackend, default_expire: timedelta = timedelta(minutes=5), jitter: float = 0.1):
+        self.backend = backend
+        self.default_expire = default_expire
+        self.jitter = jitter
+        self.inflight: dict[str, asyncio.Future] = {}
+
+    @property
+    def shared(self) -> bool:
+        return self.backend.shared
+
+    def _ttl(self, expire: Optional[timedelta]) -> int:
+        seconds = (expire or self.default_expire).total_seconds()
+        return max(1, int(seconds * (1 + random.uniform(0, self.jitter))))
+
+    def _serialize(self, value: Any) -> str:
+        if isinstance(value, (str, int, float, bool)): return str(value)
+        if isinstance(value, SQLModel): return value.model_dump_json()
+        if isinstance(value, (dict, list)): return json.dumps([item.model_dump(mode="json") if isinstance(item, SQLModel) else item for item in value] if isinstance(value, list) else value)
+        raise TypeError(f"Unsupported type for caching: {type(value)}")
+
+    async def set(self, key: str, value: Any, expire: Optional[timedelta] = None) -> None:
+        await self.backend.set(key, self._serialize(value), self._ttl(expire))
+
+    async def get(self, key: str) -> Any:
+        data = await self.backend.get(key)
         if data is None: return None
         try: return json.loads(data)
         except json.JSONDecodeError: return data
 
+    async def get_version(self, namespace: str) -> str:
+        key = f"version:{namespace}"
+        version = await self.backend.get(key)
+        if version is not None: return version
+        await self.backend.set(key, str(time.time_ns()), only_if_missing=True)
+        return await self.backend.get(key) or "0"
+
+    async def bump_version(self, namespace: str) -> None:
+        await self.backend.incr(f"version:{namespace}")
+
+    async def set_flag(self, key: str, ttl: Optional[float] = None) -> None:
+        await self.backend.set_flag(f"flag:{key}", ttl)
+
+    async def has_flag(self, key: str) -> bool:
+        return await self.backend.has_flag(f"flag:{key}")
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[str]], expire: Optional[timedelta] = None) -> str:
+        cached = await self.backend.get(key)
+        if cached is not None: return cached
+        if key in self.inflight: return await asyncio.shield(self.inflight[key])
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            value = await loader()
+            await self.backend.set(key, value, self._ttl(expire))
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self.inflight.pop(key, None)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def create_cache_client() -> CacheClient:
+    if config.REDIS_URL: backend = RedisCacheBackend(Redis.from_url(config.REDIS_URL, decode_responses=True))
+    else: backend = MemoryCacheBackend(config.CACHE_MEMORY_MAX_ENTRIES)
+    return CacheClient(backend, default_expire=timedelta(seconds=config.CACHE_TTL_SECONDS), jitter=config.CACHE_TTL_JITTER)
+
 
-def get_redis(request: Request) -> CacheClient:
-    redis: Redis = request.app.state.redis
-    return CacheClient(redis)
+def get_cache(request: Request) -> CacheClient:
+    return request.app.state.cache
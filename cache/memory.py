@@ -0,0 +1,61 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.entries: OrderedDict[Any, tuple[Any, Optional[float]]] = OrderedDict()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self.entries[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize: self.entries.popitem(last=False)
+
+    def delete(self, key: Any) -> None:
+        self.entries.pop(key, None)
+
+    def purge_expired(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (_, expires_at) in self.entries.items() if expires_at is not None and expires_at <= now]: del self.entries[key]
+
+    def evict(self, predicate: Callable[[Any, Any], bool]) -> None:
+        for key in [key for key, (value, _) in self.entries.items() if predicate(key, value)]: del self.entries[key]
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self.entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+caches: dict[str, TTLCache] = {}
+
+
+def named_cache(name: str, maxsize: int, ttl: Optional[float] = None) -> TTLCache:
+    if name not in caches: caches[name] = TTLCache(maxsize, ttl)
+    return caches[name]
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    return {name: cache.stats() for name, cache in caches.items()}
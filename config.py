@@ -1,4 +1,5 @@
 from fastapi.security import OAuth2PasswordBearer
+from typing import Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field, ValidationError
 
@@ -19,6 +20,32 @@ class Settings(BaseSettings):
     AWS_REGION: str = Field(description="AWS Region")
     S3_BUCKET_NAME: str = Field(description="AWS Region")
     AWS_DIST_URL: str = Field(description="AWS Region")
+    S3_ENDPOINT_URL: Optional[str] = Field(default=None, description="Custom S3 endpoint, e.g. a local S3-compatible server")
+    S3_MAX_POOL_CONNECTIONS: int = Field(default=50, ge=1, description="S3 HTTP connection pool size and storage worker threads")
+    S3_MAX_ATTEMPTS: int = Field(default=3, ge=1, description="S3 request attempts including retries")
+    S3_MULTIPART_PART_SIZE: int = Field(default=8 * 1024 * 1024, ge=5 * 1024 * 1024, description="Bytes read and uploaded per multipart part")
+    S3_MULTIPART_CONCURRENCY: int = Field(default=4, ge=1, description="Multipart parts uploaded in parallel per upload")
+    MEDIA_BATCH_UPLOAD_CONCURRENCY: int = Field(default=8, ge=1, description="Files streamed to storage at once per batch upload")
+    MEDIA_VARIANT_MAX_DIMENSION: int = Field(default=4096, ge=1, description="Largest width or height accepted for image variants")
+    MEDIA_VARIANT_WORKERS: int = Field(default=2, ge=1, description="Processes used to render image variants")
+    MEDIA_VARIANT_QUALITY: int = Field(default=82, ge=1, le=100, description="Encoder quality for lossy image variants")
+    MEDIA_VARIANT_MAX_SOURCE_PIXELS: int = Field(default=50_000_000, ge=1, description="Largest original image, in pixels, that variants are rendered from")
+    MEDIA_VARIANT_MAX_SOURCE_BYTES: int = Field(default=50 * 1024 * 1024, ge=1, description="Largest original file, in bytes, that variants are rendered from")
+    MEDIA_UPLOAD_EXPIRY_SECONDS: int = Field(default=3600, ge=60, description="Lifetime of presigned direct-upload reservations")
+    MEDIA_BULK_DELETE_MAX_IDS: int = Field(default=5000, ge=1, description="Most media ids accepted by one bulk delete request")
+    STORAGE_DELETE_CONCURRENCY: int = Field(default=4, ge=1, description="Multi-object storage delete calls sent at once")
+    STORAGE_DELETE_RETRY_SECONDS: int = Field(default=60, ge=1, description="Base backoff before a failed storage delete is retried")
+    CONTENT_PATCH_MAX_OPERATIONS: int = Field(default=32, ge=1, description="Most operations accepted in one JSON Patch request")
+    REDIS_URL: Optional[str] = Field(default=None, description="Redis URL, in-process cache is used when unset and then token revocation only applies within the process that revoked the token")
+    CACHE_TTL_SECONDS: int = Field(default=300, description="Default cache entry lifetime in seconds")
+    CACHE_TTL_JITTER: float = Field(default=0.1, description="Random fraction added to cache lifetimes")
+    CACHE_MEMORY_MAX_ENTRIES: int = Field(default=10000, description="Maximum entries held by the in-process cache")
+    HTTP_CACHE_CONTROL: str = Field(default="private, no-cache", description="Cache-Control sent with ETag-validated reads")
+    PASSWORD_HASH_ROUNDS: int = Field(default=12, ge=4, le=31, description="bcrypt cost factor, older hashes are upgraded on login")
+    PASSWORD_HASH_MAX_CONCURRENCY: int = Field(default=4, ge=1, description="Maximum password hashes computed at once per process")
+    TOKEN_CACHE_MAX_ENTRIES: int = Field(default=10000, description="Maximum verified tokens held per process")
+    REFERENCE_CACHE_TTL_SECONDS: int = Field(default=300, description="Lifetime of cached role, app and user lookups")
+    REFERENCE_CACHE_MAX_ENTRIES: int = Field(default=4096, description="Maximum entries per reference lookup cache")
     AUTH_SCHEME: OAuth2PasswordBearer = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
     class Config:
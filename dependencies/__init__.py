@@ -1,15 +1,18 @@
-from typing import Annotated
+from typing import Annotated, List
 from fastapi import Depends, File, UploadFile
 from httpx import AsyncClient
 from sqlmodel.ext.asyncio.session import AsyncSession
-from cache import CacheClient, get_redis
+from cache import CacheClient, get_cache
 from database import get_async_session
 from schemas.utils_schema import CurrentUser
-from utils import get_current_user, get_http_client
+from services.s3_service import S3Service
+from utils import get_current_user, get_http_client, get_storage
 
 
 session_dependency = Annotated[AsyncSession, Depends(get_async_session)]
 user_dependency = Annotated[CurrentUser, Depends(get_current_user)]
-cache_dependency = Annotated[CacheClient, Depends(get_redis)]
+cache_dependency = Annotated[CacheClient, Depends(get_cache)]
 http_dependency = Annotated[AsyncClient, Depends(get_http_client)]
+storage_dependency = Annotated[S3Service, Depends(get_storage)]
 file_dependency = Annotated[UploadFile, File(description="Media file to upload")]
+files_dependency = Annotated[List[UploadFile], File(description="Media files to upload")]
@@ -35,3 +35,13 @@ class UnprocessableEntityException(HTTPException):
 class ConflictException(HTTPException):
     def __init__(self, detail=None):
         super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+class PreconditionFailedException(HTTPException):
+    def __init__(self, detail=None):
+        super().__init__(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=detail)
+
+
+class ServiceUnavailableException(HTTPException):
+    def __init__(self, detail=None):
+        super().__init__(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail)
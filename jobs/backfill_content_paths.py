@@ -0,0 +1,28 @@
+import asyncio
+from sqlmodel import select
+from cache import CacheClient, create_cache_client
+from database import async_session
+from models import App, Content
+from services.conent_service import ContentService
+
+
+async def backfill_content_paths(cache: CacheClient) -> int:
+    updated, service = 0, ContentService()
+    async with async_session() as session:
+        app_ids = (await session.exec(select(App.id).where(App.id.in_(select(Content.app_id).where(Content.path == None))))).all()
+        for app_id in app_ids:
+            rows = await service.backfill_paths(app_id, session)
+            await session.commit()
+            if rows: await cache.bump_version(f"content:{app_id}")
+            updated += rows
+    return updated
+
+
+async def main():
+    cache = create_cache_client()
+    try: print(f"Backfilled paths for {await backfill_content_paths(cache)} content rows.")
+    finally: await cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
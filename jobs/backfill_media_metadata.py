@@ -0,0 +1,46 @@
+import asyncio
+from sqlalchemy import bindparam, update
+from sqlmodel import select
+from cache import CacheClient, create_cache_client
+from database import async_session
+from models import Media, MediaTypeEnum
+from services.s3_service import S3Service
+
+BATCH_SIZE = 200
+CONCURRENCY = 8
+
+
+async def backfill_media_metadata(s3: S3Service, cache: CacheClient) -> int:
+    updated, last_id, semaphore = 0, "", asyncio.Semaphore(CONCURRENCY)
+
+    async def extract(media: dict) -> dict:
+        async with semaphore: return {"media_id": media["id"], **await s3.extract_metadata(media["file_key"], media["file_size"], media["mime_type"])}
+
+    async with async_session() as session:
+        while True:
+            statement = select(Media.id, Media.app_id, Media.file_key, Media.file_size, Media.mime_type).where(Media.id > last_id, Media.media_type != MediaTypeEnum.other, Media.width == None, Media.height == None, Media.duration == None)
+            result = await session.exec(statement.order_by(Media.id).limit(BATCH_SIZE))
+            rows = result.mappings().all()
+            if not rows: return updated
+            last_id = rows[-1]["id"]
+            extracted = [values for values in await asyncio.gather(*(extract(row) for row in rows)) if len(values) > 1]
+            if extracted:
+                table = Media.__table__
+                statement = update(table).where(table.c.id == bindparam("media_id")).values(width=bindparam("width"), height=bindparam("height"), duration=bindparam("duration"))
+                await session.exec(statement, params=[{"width": None, "height": None, "duration": None, **values} for values in extracted])
+                await session.commit()
+                updated_ids = {values["media_id"] for values in extracted}
+                for app_id in {row["app_id"] for row in rows if row["id"] in updated_ids}: await cache.bump_version(f"media:{app_id}")
+            updated += len(extracted)
+
+
+async def main():
+    s3, cache = S3Service(), create_cache_client()
+    try: print(f"Backfilled metadata for {await backfill_media_metadata(s3, cache)} media files.")
+    finally:
+        s3.close()
+        await cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,28 @@
+import asyncio
+from database import async_session
+from services.media_service import MediaService
+from services.s3_service import S3Service
+
+BATCH_SIZE = 500
+
+
+async def cleanup_expired_uploads(s3: S3Service) -> tuple[int, int]:
+    removed, postponed = 0, 0
+    async with async_session() as session:
+        service = MediaService(session, s3)
+        while True:
+            batch_removed, batch_postponed = await service.expire_uploads(BATCH_SIZE)
+            removed, postponed = removed + batch_removed, postponed + batch_postponed
+            if not batch_removed and not batch_postponed: return removed, postponed
+
+
+async def main():
+    s3 = S3Service()
+    try:
+        removed, postponed = await cleanup_expired_uploads(s3)
+        print(f"Removed {removed} expired media uploads, {postponed} postponed.")
+    finally: s3.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
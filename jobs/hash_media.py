@@ -0,0 +1,52 @@
+import asyncio
+from sqlmodel import select
+from cache import CacheClient, create_cache_client
+from database import async_session
+from models import Media
+from services.media_service import MediaService
+from services.s3_service import S3Service
+
+BATCH_SIZE = 100
+CONCURRENCY = 4
+
+
+async def hash_media(s3: S3Service, cache: CacheClient) -> tuple[int, int, int]:
+    hashed, deduplicated, failed, last_id, semaphore = 0, 0, 0, "", asyncio.Semaphore(CONCURRENCY)
+
+    async def digest(file_key: str):
+        async with semaphore:
+            try: return await s3.hash_object(file_key)
+            except Exception as e:
+                print(f"Failed to hash {file_key}: {e}")
+                return None
+
+    async with async_session() as session:
+        service = MediaService(session, s3)
+        while True:
+            result = await session.exec(select(Media.id, Media.app_id, Media.file_key).where(Media.id > last_id, Media.sha256 == None).order_by(Media.id).limit(BATCH_SIZE))
+            rows = result.all()
+            await session.commit()
+            if not rows: return hashed, deduplicated, failed
+            last_id = rows[-1].id
+            for row, sha256 in zip(rows, await asyncio.gather(*(digest(row.file_key) for row in rows))):
+                if sha256 is None:
+                    failed += 1
+                    continue
+                hashed += 1
+                if await service.record_media_hash(row.app_id, row.id, row.file_key, sha256):
+                    deduplicated += 1
+                    await cache.bump_version(f"media:{row.app_id}")
+
+
+async def main():
+    s3, cache = S3Service(), create_cache_client()
+    try:
+        hashed, deduplicated, failed = await hash_media(s3, cache)
+        print(f"Hashed {hashed} media files, {deduplicated} deduplicated, {failed} failed.")
+    finally:
+        s3.close()
+        await cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import json
+import os
+from datetime import timedelta
+from typing import AsyncIterator, Optional
+from sqlalchemy import literal, union_all
+from sqlmodel import delete, select
+from cache import CacheClient, create_cache_client
+from database import async_session
+from models import Media, MediaUpload, MediaVariant, default_time
+from services.media_service import MediaService
+from services.s3_service import S3Service
+
+BATCH_SIZE = 1000
+CHECKPOINT_INTERVAL = 10000
+DEFAULT_PREFIX = "media/"
+DEFAULT_GRACE_SECONDS = 24 * 3600
+FINDINGS = ("orphan", "dangling_media", "dangling_variant")
+
+
+class StorageReconciler:
+    def __init__(self, s3: S3Service, cache: CacheClient, prefix: str = DEFAULT_PREFIX, apply: bool = False, grace_seconds: int = DEFAULT_GRACE_SECONDS, checkpoint_path: Optional[str] = None):
+        self.s3 = s3
+        self.cache = cache
+        self.prefix = prefix
+        self.apply = apply
+        self.cutoff = default_time() - timedelta(seconds=grace_seconds)
+        self.checkpoint_path = checkpoint_path
+        self.report = {"prefix": prefix, "after": "", "objects": 0, "references": 0, "found": dict.fromkeys(FINDINGS, 0), "deleted": dict.fromkeys(FINDINGS, 0)}
+        self.found = {kind: [] for kind in FINDINGS}
+        self.since_checkpoint = 0
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as file: checkpoint = json.load(file)
+            if checkpoint.get("prefix") == prefix: self.report.update(checkpoint)
+
+    async def _objects(self) -> AsyncIterator[tuple[str, object]]:
+        async for item in self.s3.iter_objects(self.prefix, self.report["after"]): yield item["Key"], item["LastModified"]
+
+    def _references_statement(self):
+        sources = []
+        for model, kind in ((Media, "media"), (MediaVariant, "variant"), (MediaUpload, "upload")):
+            sources.append(select(model.file_key.label("file_key"), literal(kind).label("kind"), model.created_at.label("created_at")).where(model.file_key.startswith(self.prefix, autoescape=True), model.file_key.collate("C") > self.report["after"]))
+        references = union_all(*sources).subquery()
+        return select(references.c.file_key, references.c.kind, references.c.created_at).order_by(references.c.file_key.collate("C")).execution_options(yield_per=BATCH_SIZE)
+
+    async def _flush(self, session, position: str) -> None:
+        if self.apply:
+            if orphans := self.found["orphan"]:
+                pending = await MediaService(session, self.s3).purge_storage_objects(orphans)
+                self.report["deleted"]["orphan"] += len(orphans) - pending
+            stale_apps = set()
+            for kind, model in (("dangling_media", Media), ("dangling_variant", MediaVariant)):
+                if not self.found[kind]: continue
+                statement = delete(model).where(model.file_key.in_(self.found[kind]), model.created_at < self.cutoff)
+                if model is Media:
+                    app_ids = (await session.exec(statement.returning(Media.app_id))).scalars().all()
+                    self.report["deleted"][kind] += len(app_ids)
+                    stale_apps.update(app_ids)
+                else: self.report["deleted"][kind] += (await session.exec(statement)).rowcount
+            await session.commit()
+            for app_id in stale_apps: await self.cache.bump_version(f"media:{app_id}")
+        self.found = {kind: [] for kind in FINDINGS}
+        self.report["after"], self.since_checkpoint = position, 0
+        if self.checkpoint_path:
+            with open(f"{self.checkpoint_path}.tmp", "w") as file: json.dump(self.report, file)
+            os.replace(f"{self.checkpoint_path}.tmp", self.checkpoint_path)
+
+    def _record(self, kind: str, file_key: str) -> None:
+        print(f"{kind}\t{file_key}")
+        self.report["found"][kind] += 1
+        self.found[kind].append(file_key)
+
+    async def run(self) -> dict:
+        async with async_session() as session, async_session() as stream_session:
+            references = (await stream_session.stream(self._references_statement())).tuples()
+            objects = self._objects()
+            current_object, reference, position = await anext(objects, None), await anext(references, None), self.report["after"]
+            while current_object is not None or reference is not None:
+                if reference is None or (current_object is not None and current_object[0] < reference[0]):
+                    position, last_modified = current_object
+                    self.report["objects"] += 1
+                    if last_modified < self.cutoff: self._record("orphan", position)
+                    current_object = await anext(objects, None)
+                else:
+                    position, stale_kinds = reference[0], set()
+                    while reference is not None and reference[0] == position:
+                        self.report["references"] += 1
+                        if reference[1] != "upload" and reference[2] < self.cutoff: stale_kinds.add(reference[1])
+                        reference = await anext(references, None)
+                    if current_object is not None and current_object[0] == position:
+                        self.report["objects"] += 1
+                        current_object = await anext(objects, None)
+                    else:
+                        for kind in sorted(stale_kinds): self._record(f"dangling_{kind}", position)
+                self.since_checkpoint += 1
+                if self.since_checkpoint >= CHECKPOINT_INTERVAL or max(map(len, self.found.values())) >= BATCH_SIZE: await self._flush(session, position)
+            await self._flush(session, position)
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path): os.remove(self.checkpoint_path)
+        return self.report
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Find storage objects without media rows and media rows without storage objects.")
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX, help="Storage key prefix to reconcile, e.g. media/<app_id>/")
+    parser.add_argument("--apply", action="store_true", help="Delete orphaned objects and dangling rows instead of only reporting them")
+    parser.add_argument("--grace-seconds", type=int, default=DEFAULT_GRACE_SECONDS, help="Ignore objects and rows newer than this")
+    parser.add_argument("--checkpoint", help="File used to resume an interrupted run")
+    args = parser.parse_args()
+    s3, cache = S3Service(), create_cache_client()
+    try:
+        report = await StorageReconciler(s3, cache, args.prefix, args.apply, args.grace_seconds, args.checkpoint).run()
+        print(json.dumps(report))
+    finally:
+        s3.close()
+        await cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
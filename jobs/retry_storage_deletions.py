@@ -0,0 +1,28 @@
+import asyncio
+from database import async_session
+from services.media_service import MediaService
+from services.s3_service import S3Service
+
+BATCH_SIZE = 1000
+
+
+async def retry_storage_deletions(s3: S3Service) -> tuple[int, int]:
+    deleted, failed = 0, 0
+    async with async_session() as session:
+        service = MediaService(session, s3)
+        while True:
+            batch_deleted, batch_failed = await service.retry_storage_deletions(BATCH_SIZE)
+            deleted, failed = deleted + batch_deleted, failed + batch_failed
+            if not batch_deleted and not batch_failed: return deleted, failed
+
+
+async def main():
+    s3 = S3Service()
+    try:
+        deleted, failed = await retry_storage_deletions(s3)
+        print(f"Deleted {deleted} queued storage objects, {failed} rescheduled.")
+    finally: s3.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,12 +1,15 @@
 import httpx
 import uvicorn
 from fastapi import FastAPI
+from cache import create_cache_client
 from config import config
 from contextlib import asynccontextmanager
 from middleware.auth_middleware import AuthMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from routes import setup_v1_routes
 from seed import seed_roles
+from services.helpers.image_variants import shutdown_variant_pool
+from services.s3_service import S3Service
 from mangum import Mangum
 
 TITLE = config.PROJECT_NAME
@@ -18,12 +21,15 @@ VERSION = config.PROJECT_VERSION
 async def lifespan(app: FastAPI):
     # startup
     await seed_roles()
-    # app.state.redis = Redis(host="localhost", port=6379, db=0, decode_responses=True)
+    app.state.cache = create_cache_client()
     app.state.http_client = httpx.AsyncClient()
+    app.state.storage = S3Service()
     yield  # Application runs here
     # shutdown
-    # app.state.redis.close()
+    await app.state.cache.close()
     await app.state.http_client.aclose()
+    app.state.storage.close()
+    shutdown_variant_pool()
 
 
 app = FastAPI(title=TITLE, description=DESCRIPTION, version=VERSION, root_path="/api/v1", lifespan=lifespan)
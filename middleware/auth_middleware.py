@@ -1,17 +1,21 @@
+import re
 from datetime import datetime, timedelta, timezone
-from fastapi import HTTPException
+from fnmatch import translate
+from typing import Sequence
+from fastapi import HTTPException, Request
+from starlette.types import ASGIApp, Receive, Scope, Send
 from config import config
-from starlette.middleware.base import BaseHTTPMiddleware
 from exceptions import UnauthorizedException
 from responses import AuthResponse
 from services.auth_service import AuthService
-from fnmatch import fnmatch
 
+EXCLUDE_URLS = ("/docs", "/api/v1/openapi.json", "/api/v1/auth/*")
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, dispatch=None):
-        super().__init__(app, dispatch)
-        self.exclude_urls = ["/docs", "/api/v1/openapi.json", "/api/v1/auth/*"]
+
+class AuthMiddleware:
+    def __init__(self, app: ASGIApp, exclude_urls: Sequence[str] = EXCLUDE_URLS):
+        self.app = app
+        self.exclude_pattern = re.compile("|".join(translate(pattern) for pattern in exclude_urls))
         self.auth_scheme = config.AUTH_SCHEME
         self.auth_service = AuthService()
         self.time_widow = timedelta(minutes=5)
@@ -21,12 +25,11 @@ class AuthMiddleware(BaseHTTPMiddleware):
         current_time = datetime.now(timezone.utc)
         return (expiry_time - current_time) <= timedelta(minutes=5)
 
-    async def dispatch(self, request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or self.exclude_pattern.match(scope["path"]): return await self.app(scope, receive, send)
         try:
-            response = await call_next(request)
-            if any(fnmatch(request.url.path, pattern) for pattern in self.exclude_urls): return response
-            token = await self.auth_scheme(request)
+            token = await self.auth_scheme(Request(scope))
             if not token: raise UnauthorizedException("Missing authentication token")
-            payload = self.auth_service.verify_token(token)
-            return response
-        except HTTPException as e: return AuthResponse(str(e))
+            scope.setdefault("state", {})["auth_claims"] = await self.auth_service.verify_token(token, scope["app"].state.cache)
+        except HTTPException as e: return await AuthResponse(str(e))(scope, receive, send)
+        await self.app(scope, receive, send)
@@ -3,12 +3,15 @@ import secrets
 from typing import List, Optional
 from uuid import uuid4
 from pydantic import Json
-from sqlalchemy import DateTime, Index, func
-from sqlmodel import Field, Relationship, SQLModel, JSON
+from sqlalchemy import Column, Computed, DateTime, Index, func
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlmodel import Field, Relationship, SQLModel
 from datetime import datetime, timezone
 
 #################### HELPERS ####################
 
+SEARCH_CONFIG = "english"
+
 
 def generate_uuid():
     return str(uuid4())
@@ -22,6 +25,15 @@ def generate_secret_key() -> str:
 def default_time():
     return datetime.now(timezone.utc)
 
+
+def search_vector_column(*weighted_sources: tuple[str, str]) -> Column:
+    vectors = [f"setweight({source}, '{weight}')" for source, weight in weighted_sources]
+    return Column(TSVECTOR, Computed(" || ".join(vectors), persisted=True))
+
+
+def text_vector(column: str) -> str:
+    return f"to_tsvector('{SEARCH_CONFIG}', coalesce({column}, ''))"
+
 #################### ENUMS ####################
 
 
@@ -43,6 +55,12 @@ class MediaTypeEnum(str, Enum):
     other = "other"
 
 
+class ImageFormatEnum(str, Enum):
+    jpeg = "jpeg"
+    png = "png"
+    webp = "webp"
+
+
 class DocumentTypeEnum(str, Enum):
     pdf = "pdf"
     doc = "doc"
@@ -125,38 +143,90 @@ class User(BaseModel, table=True):
 class Content(BaseModel, table=True):
     name: str = Field(index=True, nullable=False)
     slug: str = Field(index=True, nullable=False)
-    data: Optional[Json] = Field(default=None, sa_type=JSON)
+    data: Optional[Json] = Field(default=None, sa_type=JSONB)
     app_id: str = Field(foreign_key="app.id", nullable=False, index=True, ondelete="CASCADE")
     parent_id: Optional[str] = Field(default=None, foreign_key="content.id", index=True)
+    path: Optional[str] = Field(default=None)
+    version: int = Field(default=1, nullable=False, sa_column_kwargs={"server_default": "1"})
+    search_vector: Optional[str] = Field(default=None, sa_column=search_vector_column((text_vector("name"), "A"), (f"jsonb_to_tsvector('{SEARCH_CONFIG}', coalesce(data, '{{}}'::jsonb), '[\"string\"]')", "B")))
     children: Optional[List["Content"]] = Relationship(sa_relationship_kwargs={"lazy": "selectin", "join_depth": 100, "cascade": "delete"})
     app: App = Relationship(back_populates="content")
     __table_args__ = (
         Index("unique_slug_per_parent_and_app", "slug", "parent_id", "app_id", unique=True, postgresql_where="parent_id IS NOT NULL"),
         Index("unique_slug_app_when_no_parent", "slug", "app_id", unique=True, postgresql_where="parent_id IS NULL"),
+        Index("unique_path_per_app", "app_id", "path", unique=True, postgresql_ops={"path": "text_pattern_ops"}),
+        Index("index_content_app_id_updated_at", "app_id", "updated_at"),
+        Index("index_content_data_gin", "data", postgresql_using="gin", postgresql_ops={"data": "jsonb_path_ops"}),
+        Index("index_content_search_vector", "search_vector", postgresql_using="gin"),
     )
 
 
 class Media(BaseModel, table=True):
     name: str = Field(index=True, nullable=False)
     original_filename: str = Field(nullable=False)
-    file_key: str = Field(nullable=False, unique=True, index=True)
-    file_path: str = Field(nullable=False, unique=True, index=True)
+    file_key: str = Field(nullable=False, index=True)
+    file_path: str = Field(nullable=False, index=True)
     file_extension: str = Field(nullable=False)
     file_size: int = Field(nullable=False)
     mime_type: str = Field(nullable=False)
+    sha256: Optional[str] = Field(default=None)
     media_type: MediaTypeEnum = Field(nullable=False)
     width: Optional[int] = Field(default=None)
     height: Optional[int] = Field(default=None)
     duration: Optional[float] = Field(default=None)
     alt_text: Optional[str] = Field(default=None)
     caption: Optional[str] = Field(default=None)
-    meta: Optional[Json] = Field(default=None, sa_type=JSON)
+    meta: Optional[Json] = Field(default=None, sa_type=JSONB)
     is_public: bool = Field(default=True, nullable=False)
+    search_vector: Optional[str] = Field(default=None, sa_column=search_vector_column((text_vector("name"), "A"), (text_vector("alt_text"), "B"), (text_vector("caption"), "C")))
     app_id: str = Field(foreign_key="app.id", nullable=False, index=True, ondelete="CASCADE")
     uploaded_by_id: str = Field(foreign_key="user.id", nullable=False)
     app: App = Relationship(back_populates="media")
-    uploaded_by: "User" = Relationship(sa_relationship_kwargs={"lazy": "selectin", "primaryjoin": "Media.uploaded_by_id == User.id"})
-    __table_args__ = (Index("index_media_app_id_created_at", "app_id", "created_at"), Index("index_media_media_type", "media_type"))
+    uploaded_by: "User" = Relationship(sa_relationship_kwargs={"lazy": "raise", "primaryjoin": "Media.uploaded_by_id == User.id"})
+    __table_args__ = (
+        Index("index_media_app_id_created_at", "app_id", "created_at"),
+        Index("index_media_app_id_updated_at", "app_id", "updated_at"),
+        Index("index_media_app_id_sha256", "app_id", "sha256"),
+        Index("index_media_media_type", "media_type"),
+        Index("index_media_meta_gin", "meta", postgresql_using="gin", postgresql_ops={"meta": "jsonb_path_ops"}),
+        Index("index_media_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+
+class MediaVariant(BaseModel, table=True):
+    width: int = Field(nullable=False)
+    height: int = Field(nullable=False)
+    format: ImageFormatEnum = Field(nullable=False)
+    file_key: str = Field(nullable=False, unique=True)
+    file_size: int = Field(nullable=False)
+    media_id: str = Field(foreign_key="media.id", nullable=False, ondelete="CASCADE")
+    __table_args__ = (Index("unique_variant_per_media", "media_id", "width", "height", "format", unique=True),)
+
+
+class MediaUpload(BaseModel, table=True):
+    file_key: str = Field(nullable=False, unique=True)
+    name: str = Field(nullable=False)
+    original_filename: str = Field(nullable=False)
+    file_extension: str = Field(nullable=False)
+    file_size: int = Field(nullable=False)
+    mime_type: str = Field(nullable=False)
+    media_type: MediaTypeEnum = Field(nullable=False)
+    checksum_sha256: Optional[str] = Field(default=None)
+    multipart_upload_id: Optional[str] = Field(default=None)
+    alt_text: Optional[str] = Field(default=None)
+    caption: Optional[str] = Field(default=None)
+    meta: Optional[Json] = Field(default=None, sa_type=JSONB)
+    is_public: bool = Field(default=True, nullable=False)
+    expires_at: datetime = Field(nullable=False, sa_type=DateTime(timezone=True), index=True)
+    app_id: str = Field(foreign_key="app.id", nullable=False, index=True, ondelete="CASCADE")
+    uploaded_by_id: str = Field(foreign_key="user.id", nullable=False)
+
+
+class StorageDeletion(BaseModel, table=True):
+    file_key: str = Field(nullable=False, unique=True)
+    attempts: int = Field(default=0, nullable=False)
+    last_error: Optional[str] = Field(default=None)
+    next_attempt_at: datetime = Field(default_factory=default_time, nullable=False, sa_type=DateTime(timezone=True), index=True)
 
 
 class Document(BaseModel, table=True):
@@ -171,10 +241,16 @@ class Document(BaseModel, table=True):
     page_count: Optional[int] = Field(default=None)
     author: Optional[str] = Field(default=None)
     description: Optional[str] = Field(default=None)
-    meta: Optional[Json] = Field(default=None, sa_type=JSON)
+    meta: Optional[Json] = Field(default=None, sa_type=JSONB)
     is_public: bool = Field(default=False, nullable=False)
+    search_vector: Optional[str] = Field(default=None, sa_column=search_vector_column((text_vector("name"), "A"), (text_vector("description"), "B"), (text_vector("author"), "C")))
     app_id: str = Field(foreign_key="app.id", nullable=False, index=True, ondelete="CASCADE")
     uploaded_by_id: str = Field(foreign_key="user.id", nullable=False)
     app: App = Relationship(back_populates="documents")
     uploaded_by: "User" = Relationship(sa_relationship_kwargs={"lazy": "selectin", "primaryjoin": "Document.uploaded_by_id == User.id"})
-    __table_args__ = (Index("index_document_app_id_created_at", "app_id", "created_at"), Index("index_document_document_type", "document_type"))
+    __table_args__ = (
+        Index("index_document_app_id_created_at", "app_id", "created_at"),
+        Index("index_document_document_type", "document_type"),
+        Index("index_document_meta_gin", "meta", postgresql_using="gin", postgresql_ops={"meta": "jsonb_path_ops"}),
+        Index("index_document_search_vector", "search_vector", postgresql_using="gin"),
+    )
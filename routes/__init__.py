@@ -1,5 +1,5 @@
 from fastapi import Depends, FastAPI
-from routes.v1 import apps, auth, content, domain, media
+from routes.v1 import apps, auth, content, domain, media, metrics, search
 from config import config
 
 auth_dependency = Depends(config.AUTH_SCHEME)
@@ -11,3 +11,5 @@ def setup_v1_routes(app: FastAPI):
     app.include_router(content.router, dependencies=[auth_dependency])
     app.include_router(domain.router, dependencies=[auth_dependency])
     app.include_router(media.router, dependencies=[auth_dependency])
+    app.include_router(metrics.router, dependencies=[auth_dependency])
+    app.include_router(search.router, dependencies=[auth_dependency])
@@ -1,12 +1,15 @@
 from datetime import timedelta
+from typing import Annotated, Optional
 from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from starlette import status
-from schemas.auth_schema import AuthResponseSchema, RefreshBody
+from schemas.auth_schema import AuthResponseSchema, LogoutBody, LogoutResponseSchema, RefreshBody
 from schemas.user_schema import UserCreateSchema, UserOutSchema
 from services.auth_service import AuthService
 from services.user_service import UserService
-from dependencies import session_dependency
+from config import config
+from dependencies import cache_dependency, session_dependency
+from exceptions import UnauthorizedException
 
 user_service = UserService()
 auth_service = AuthService()
@@ -31,8 +34,8 @@ async def register(user_data: UserCreateSchema, session: session_dependency):
 
 
 @router.post("/token/refresh", operation_id="refresh_token", status_code=status.HTTP_200_OK, response_model=AuthResponseSchema)
-async def refresh_token(body: RefreshBody):
-    payload = auth_service.verify_token(body.token)
+async def refresh_token(body: RefreshBody, cache: cache_dependency):
+    payload = await auth_service.verify_token(body.token, cache)
     host = payload.get("host", None)
     role = payload.get("role", None)
     user_id = payload.get("sub", None)
@@ -40,3 +43,11 @@ async def refresh_token(body: RefreshBody):
     access_token_timedelta = timedelta(minutes=30)
     access_token = auth_service.create_access_token({"sub": user_id, "host": host, "domain": domain, "role": role}, access_token_timedelta)
     return AuthResponseSchema(status="Success", user_id=user_id, host=host, role=role, redirect_url=None, access_token=access_token, refresh_token=body.token, token_type="Bearer", token_max_age=access_token_timedelta.total_seconds())
+
+
+@router.post("/logout", operation_id="logout", status_code=status.HTTP_200_OK, response_model=LogoutResponseSchema)
+async def logout(token: Annotated[Optional[str], Depends(config.AUTH_SCHEME)], cache: cache_dependency, body: Optional[LogoutBody] = None):
+    if not token: raise UnauthorizedException("Missing authentication token")
+    await auth_service.revoke_token(token, cache)
+    if body and body.refresh_token: await auth_service.revoke_token(body.refresh_token, cache)
+    return LogoutResponseSchema(status="Success")
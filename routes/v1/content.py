@@ -1,13 +1,21 @@
 import json
-from typing import Sequence
+from typing import List, Optional, Sequence
 from uuid import UUID
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 from starlette import status
-from dependencies import session_dependency
-from schemas.conent_schema import ContentCreateSchema, ContentOutSchema, ContentUpdateSchema
+from dependencies import cache_dependency, session_dependency
+from exceptions import BadRequestException, PreconditionFailedException, UnprocessableEntityException
+from schemas.conent_schema import ContentCreateSchema, ContentImportLineSchema, ContentImportResultSchema, ContentImportSchema, ContentMoveSchema, ContentOutSchema, ContentQueryOutSchema, ContentQuerySchema, ContentUpdateSchema, JsonPatchOperationSchema
 from services.conent_service import ContentService
+from utils import cache_headers, make_etag, ndjson_stream, not_modified
 
 content_service = ContentService()
+import_tree_adapter = TypeAdapter(List[ContentImportSchema])
+content_tree_adapter = TypeAdapter(List[ContentOutSchema])
+patch_operations_adapter = TypeAdapter(List[JsonPatchOperationSchema])
+JSON_PATCH_MEDIA_TYPE = "application/json-patch+json"
 
 router = APIRouter(prefix="/content", tags=["Content"])
 
@@ -21,17 +29,114 @@ async def export_content(app_id: UUID, content_id: UUID, session: session_depend
     return response
 
 
+@router.get("/export/{app_id}", operation_id="export_app_content", status_code=status.HTTP_200_OK)
+async def export_app_content(app_id: UUID, session: session_dependency, compress: bool = False):
+    rows = await content_service.stream_app_content(app_id, session)
+    filename = f"content-{app_id}.ndjson.gz" if compress else f"content-{app_id}.ndjson"
+    media_type = "application/gzip" if compress else "application/x-ndjson"
+    return StreamingResponse(ndjson_stream(rows, compress=compress), media_type=media_type, headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
+def parse_import_line(raw: bytes, line_number: int) -> Optional[ContentImportLineSchema]:
+    if not raw.strip(): return None
+    try: return ContentImportLineSchema.model_validate_json(raw)
+    except ValidationError as e: raise UnprocessableEntityException(detail=f"Invalid import line {line_number}: {e.errors(include_url=False)}")
+
+
+async def read_import_lines(request: Request) -> List[ContentImportLineSchema]:
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" not in content_type and "jsonl" not in content_type:
+        try: return content_service.flatten_import_tree(import_tree_adapter.validate_json(await request.body()))
+        except ValidationError as e: raise UnprocessableEntityException(detail=f"Invalid import payload: {e.errors(include_url=False)}")
+    lines, pending, line_number = [], b"", 0
+    async for chunk in request.stream():
+        *complete, pending = (pending + chunk).split(b"\n")
+        for raw in complete:
+            line_number += 1
+            line = parse_import_line(raw, line_number)
+            if line: lines.append(line)
+    line = parse_import_line(pending, line_number + 1)
+    if line: lines.append(line)
+    return lines
+
+
+@router.post("/import/{app_id}", operation_id="import_content", status_code=status.HTTP_200_OK, response_model=ContentImportResultSchema)
+async def import_content(app_id: UUID, request: Request, session: session_dependency, cache: cache_dependency, parent_id: Optional[UUID] = None):
+    lines = await read_import_lines(request)
+    result = await content_service.import_content(app_id, lines, session, parent_id=parent_id)
+    if result.created: await cache.bump_version(f"content:{app_id}")
+    return result
+
+
 @router.post("/{app_id}", operation_id="create_content", status_code=status.HTTP_201_CREATED, response_model=ContentOutSchema)
-async def create_content(app_id: UUID, content_data: ContentCreateSchema, session: session_dependency):
+async def create_content(app_id: UUID, content_data: ContentCreateSchema, session: session_dependency, cache: cache_dependency):
     content = await content_service.create_content(app_id, content_data, session)
+    await cache.bump_version(f"content:{app_id}")
     return content
 
 
 @router.get("/{app_id}", operation_id="get_content", status_code=status.HTTP_200_OK, response_model=Sequence[ContentOutSchema])
-async def get_content(app_id: UUID, session: session_dependency):
-    return await content_service.get_content(app_id, session)
+async def get_content(app_id: UUID, request: Request, session: session_dependency, cache: cache_dependency, parent_id: Optional[UUID] = None, max_depth: Optional[int] = Query(default=None, ge=0)):
+    validator = await cache.get_version(f"content:{app_id}") if cache.shared else await content_service.get_content_fingerprint(app_id, session)
+    etag = make_etag(validator, parent_id, max_depth)
+    if response := not_modified(request, etag): return response
+    async def load_tree():
+        tree = await content_service.get_content(app_id, session, parent_id=parent_id, max_depth=max_depth)
+        return content_tree_adapter.dump_json(tree).decode()
+    body = await cache.get_or_load(f"content:tree:{app_id}:{etag}", load_tree)
+    return Response(content=body, media_type="application/json", headers=cache_headers(etag))
+
+
+@router.post("/{app_id}/query", operation_id="query_content", status_code=status.HTTP_200_OK, response_model=ContentQueryOutSchema)
+async def query_content(app_id: UUID, query: ContentQuerySchema, session: session_dependency):
+    return await content_service.query_content(app_id, query, session)
+
+
+@router.get("/{app_id}/path", operation_id="resolve_content_path", status_code=status.HTTP_200_OK, response_model=ContentOutSchema)
+async def resolve_content_path(app_id: UUID, path: str, session: session_dependency):
+    return await content_service.get_content_by_path(app_id, path, session)
+
+
+@router.get("/{app_id}/path/ancestors", operation_id="get_content_ancestors", status_code=status.HTTP_200_OK, response_model=Sequence[ContentOutSchema])
+async def get_content_ancestors(app_id: UUID, path: str, session: session_dependency):
+    return await content_service.get_content_ancestors(app_id, path, session)
+
+
+@router.get("/{app_id}/path/subtree", operation_id="get_content_subtree", status_code=status.HTTP_200_OK, response_model=ContentOutSchema)
+async def get_content_subtree(app_id: UUID, path: str, session: session_dependency, max_depth: Optional[int] = Query(default=None, ge=0)):
+    return await content_service.get_content_subtree(app_id, path, session, max_depth=max_depth)
+
+
+@router.post("/{app_id}/{content_id}/move", operation_id="move_content", status_code=status.HTTP_200_OK, response_model=ContentOutSchema)
+async def move_content(app_id: UUID, content_id: UUID, move_data: ContentMoveSchema, session: session_dependency, cache: cache_dependency):
+    content = await content_service.move_content(app_id, content_id, move_data.parent_id, session)
+    await cache.bump_version(f"content:{app_id}")
+    return content
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    if if_match is None: return None
+    tag = if_match.strip().removeprefix("W/").strip('"')
+    if not tag.isdigit(): raise PreconditionFailedException(detail="If-Match must be a content version ETag")
+    return int(tag)
+
+
+@router.patch("/{app_id}/{content_id}", operation_id="patch_content", status_code=status.HTTP_200_OK, response_model=ContentOutSchema)
+async def patch_content(app_id: UUID, content_id: UUID, request: Request, response: Response, session: session_dependency, cache: cache_dependency, if_match: Optional[str] = Header(default=None)):
+    try: body = await request.json()
+    except ValueError: raise BadRequestException(detail="Patch body must be valid JSON")
+    patch_type = "json" if JSON_PATCH_MEDIA_TYPE in request.headers.get("content-type", "") else "merge"
+    if patch_type == "json":
+        try: body = patch_operations_adapter.validate_python(body)
+        except ValidationError as e: raise UnprocessableEntityException(detail=f"Invalid JSON Patch: {e.errors(include_url=False)}")
+    content = await content_service.patch_content(app_id, content_id, body, patch_type, session, if_match=parse_if_match(if_match))
+    await cache.bump_version(f"content:{app_id}")
+    response.headers["ETag"] = f'"{content.version}"'
+    return content
 
 
 @router.put("", operation_id="update_content", status_code=status.HTTP_200_OK, response_model=ContentOutSchema)
-async def update_content(app_id: UUID, content_id: UUID, data: ContentUpdateSchema, session: session_dependency):
-    return await content_service.update_content(app_id=app_id, content_id=content_id, data=data, session=session)
+async def update_content(app_id: UUID, content_id: UUID, data: ContentUpdateSchema, session: session_dependency, cache: cache_dependency):
+    content = await content_service.update_content(app_id=app_id, content_id=content_id, data=data, session=session)
+    await cache.bump_version(f"content:{app_id}")
+    return content
@@ -1,54 +1,120 @@
+import json
 import os
-from typing import List
+from datetime import datetime
+from typing import Annotated, List, Optional
 from uuid import UUID
-from fastapi import APIRouter
+from fastapi import APIRouter, Path, Query, Request, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
 from starlette import status
-from dependencies import session_dependency, user_dependency, file_dependency
-from models import MediaTypeEnum
-from schemas.media_schema import MediaMetaData, MediaResponse, MediaUpdateSchema
-from services.media_service import MediaService
-from utils import get_media_type
+from config import config
+from dependencies import cache_dependency, session_dependency, storage_dependency, user_dependency, file_dependency, files_dependency
+from models import ImageFormatEnum, MediaTypeEnum
+from schemas.media_schema import MediaBatchUploadResultSchema, MediaBulkDeleteOutSchema, MediaBulkDeleteSchema, MediaMetaData, MediaPageSchema, MediaResponse, MediaUpdateSchema, MediaUploadFinalizeSchema, MediaUploadInitiateOutSchema, MediaUploadInitiateSchema
+from services.media_service import MEDIA_FIELDS, MediaService
+from utils import cache_headers, get_media_type, json_default, make_etag, ndjson_stream, not_modified, parse_fields
 
 
 router = APIRouter(prefix="/media", tags=["Media"])
 
 
+@router.get("/{app_id}/stream", operation_id="stream_app_media", status_code=status.HTTP_200_OK)
+async def stream_app_media(app_id: UUID, session: session_dependency, storage: storage_dependency, cache: cache_dependency, media_type: MediaTypeEnum | None = None, updated_since: Optional[datetime] = None, fields: Optional[str] = Query(default=None, description="Comma separated item fields"), compress: bool = False):
+    service = MediaService(session, storage)
+    rows = await service.stream_app_media(app_id, cache, media_type, updated_since, parse_fields(fields, MEDIA_FIELDS))
+    filename = f"media-{app_id}.ndjson.gz" if compress else f"media-{app_id}.ndjson"
+    content_type = "application/gzip" if compress else "application/x-ndjson"
+    return StreamingResponse(ndjson_stream(rows, compress=compress), media_type=content_type, headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
 @router.get("/{app_id}/{media_id}", operation_id="get_media", status_code=status.HTTP_200_OK, response_model=MediaResponse)
-async def get_media(app_id: UUID, media_id: UUID, session: session_dependency):
-    service = MediaService(session)
-    media = await service.get_media(app_id, media_id)
-    url = await service.get_media_url(media)
-    return MediaResponse.from_model(media, url)
+async def get_media(app_id: UUID, media_id: UUID, request: Request, session: session_dependency, storage: storage_dependency, cache: cache_dependency, fields: Optional[str] = Query(default=None, description="Comma separated response fields")):
+    service = MediaService(session, storage)
+    selected_fields = parse_fields(fields, MEDIA_FIELDS)
+    validator = await cache.get_version(f"media:{app_id}") if cache.shared else await service.get_media_fingerprint(app_id, media_id)
+    etag = make_etag(validator, media_id, selected_fields)
+    if not_modified_response := not_modified(request, etag): return not_modified_response
+    media = await service.get_media_item(app_id, media_id, selected_fields)
+    return Response(content=json.dumps(media, default=json_default, separators=(",", ":")), media_type="application/json", headers=cache_headers(etag))
 
 
-@router.get("/{app_id}", operation_id="list_app_media", status_code=status.HTTP_200_OK, response_model=List[MediaResponse])
-async def list_app_media(session: session_dependency, app_id: UUID, media_type: MediaTypeEnum | None = None, limit: int = 100, offset: int = 0):
-    service = MediaService(session)
-    media_list = await service.list_app_media(app_id, media_type, limit, offset)
-    return [MediaResponse.from_model(media, await service.get_media_url(media)) for media in media_list]
+@router.get("/{app_id}/{media_id}/variants/{width}x{height}.{image_format}", operation_id="get_media_variant", status_code=status.HTTP_307_TEMPORARY_REDIRECT, response_class=RedirectResponse)
+async def get_media_variant(app_id: UUID, media_id: UUID, width: Annotated[int, Path(ge=1, le=config.MEDIA_VARIANT_MAX_DIMENSION)], height: Annotated[int, Path(ge=1, le=config.MEDIA_VARIANT_MAX_DIMENSION)], image_format: ImageFormatEnum, session: session_dependency, storage: storage_dependency, cache: cache_dependency):
+    service = MediaService(session, storage)
+    url = await service.get_variant_url(app_id, media_id, width, height, image_format, cache)
+    return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+
+@router.get("/{app_id}", operation_id="list_app_media", status_code=status.HTTP_200_OK, response_model=MediaPageSchema)
+async def list_app_media(session: session_dependency, storage: storage_dependency, cache: cache_dependency, app_id: UUID, request: Request, media_type: MediaTypeEnum | None = None, limit: int = Query(default=100, ge=1, le=1000), cursor: Optional[str] = None, fields: Optional[str] = Query(default=None, description="Comma separated item fields")):
+    service = MediaService(session, storage)
+    selected_fields = parse_fields(fields, MEDIA_FIELDS)
+    validator = await cache.get_version(f"media:{app_id}") if cache.shared else await service.get_media_fingerprint(app_id)
+    etag = make_etag(validator, media_type, limit, cursor, selected_fields)
+    if not_modified_response := not_modified(request, etag): return not_modified_response
+    items, next_cursor = await service.list_app_media(app_id, media_type, limit, cursor, selected_fields)
+    body = json.dumps({"items": items, "next_cursor": next_cursor}, default=json_default, separators=(",", ":"))
+    return Response(content=body, media_type="application/json", headers=cache_headers(etag))
 
 
 @router.post("/upload", operation_id="upload_media", status_code=status.HTTP_201_CREATED, response_model=MediaResponse)
-async def upload_media(app_id: UUID, session: session_dependency, current_user: user_dependency, file: file_dependency):
-    service = MediaService(session)
+async def upload_media(app_id: UUID, session: session_dependency, storage: storage_dependency, current_user: user_dependency, cache: cache_dependency, file: file_dependency):
+    service = MediaService(session, storage)
     file_name = os.path.splitext(file.filename)[0]
     media_type = get_media_type(file.content_type)
     meta_data = MediaMetaData(media_type=media_type, name=file_name, is_public=True, alt_text=file_name, caption=file_name, meta={})
-    media = await service.upload_media(app_id=app_id, user_id=current_user.id, file=file, meta_data=meta_data)
+    media = await service.upload_media(app_id=app_id, user_id=current_user.id, file=file, meta_data=meta_data, cache=cache)
+    await cache.bump_version(f"media:{app_id}")
+    url = await service.get_media_url(media)
+    return MediaResponse.from_model(media, url)
+
+
+@router.post("/upload/batch", operation_id="upload_media_batch", status_code=status.HTTP_200_OK, response_model=List[MediaBatchUploadResultSchema])
+async def upload_media_batch(app_id: UUID, session: session_dependency, storage: storage_dependency, current_user: user_dependency, cache: cache_dependency, files: files_dependency):
+    service = MediaService(session, storage)
+    uploads = []
+    for file in files:
+        file_name = os.path.splitext(file.filename or "")[0] or "file"
+        uploads.append((file, MediaMetaData(media_type=get_media_type(file.content_type or ""), name=file_name, is_public=True, alt_text=file_name, caption=file_name, meta={})))
+    results = await service.upload_media_batch(app_id=app_id, user_id=current_user.id, uploads=uploads, cache=cache)
+    await cache.bump_version(f"media:{app_id}")
+    return results
+
+
+@router.post("/uploads/{app_id}", operation_id="initiate_media_upload", status_code=status.HTTP_201_CREATED, response_model=MediaUploadInitiateOutSchema)
+async def initiate_media_upload(app_id: UUID, upload_data: MediaUploadInitiateSchema, session: session_dependency, storage: storage_dependency, current_user: user_dependency, cache: cache_dependency):
+    service = MediaService(session, storage)
+    return await service.initiate_upload(app_id, current_user.id, upload_data, cache)
+
+
+@router.post("/uploads/{app_id}/{upload_id}/finalize", operation_id="finalize_media_upload", status_code=status.HTTP_201_CREATED, response_model=MediaResponse)
+async def finalize_media_upload(app_id: UUID, upload_id: UUID, finalize_data: MediaUploadFinalizeSchema, session: session_dependency, storage: storage_dependency, current_user: user_dependency, cache: cache_dependency):
+    service = MediaService(session, storage)
+    media = await service.finalize_upload(app_id, upload_id, current_user.id, finalize_data)
+    await cache.bump_version(f"media:{app_id}")
     url = await service.get_media_url(media)
     return MediaResponse.from_model(media, url)
 
 
 @router.put("/{app_id}/{media_id}", operation_id="update_media", status_code=status.HTTP_200_OK, response_model=MediaResponse)
-async def update_media(app_id: UUID, media_id: UUID, update_data: MediaUpdateSchema, session: session_dependency, current_user: user_dependency):
-    service = MediaService(session)
+async def update_media(app_id: UUID, media_id: UUID, update_data: MediaUpdateSchema, session: session_dependency, storage: storage_dependency, current_user: user_dependency, cache: cache_dependency):
+    service = MediaService(session, storage)
     media = await service.update_media(app_id, media_id, update_data)
+    await cache.bump_version(f"media:{app_id}")
     url = await service.get_media_url(media)
     return MediaResponse.from_model(media, url)
 
 
+@router.post("/{app_id}/bulk-delete", operation_id="delete_media_bulk", status_code=status.HTTP_200_OK, response_model=MediaBulkDeleteOutSchema)
+async def delete_media_bulk(app_id: UUID, delete_data: MediaBulkDeleteSchema, session: session_dependency, storage: storage_dependency, current_user: user_dependency, cache: cache_dependency):
+    service = MediaService(session, storage)
+    result = await service.delete_media_bulk(app_id, delete_data)
+    await cache.bump_version(f"media:{app_id}")
+    return result
+
+
 @router.delete("/{app_id}/{media_id}", operation_id="delete_media", status_code=status.HTTP_200_OK)
-async def delete_media(app_id: UUID, media_id: UUID, session: session_dependency, current_user: user_dependency):
-    service = MediaService(session)
+async def delete_media(app_id: UUID, media_id: UUID, session: session_dependency, storage: storage_dependency, current_user: user_dependency, cache: cache_dependency):
+    service = MediaService(session, storage)
     await service.delete_media(app_id, media_id)
+    await cache.bump_version(f"media:{app_id}")
     return {"status": "success", "message": "Media deleted"}
@@ -0,0 +1,16 @@
+from typing import Dict
+from fastapi import APIRouter
+from starlette import status
+from cache.memory import cache_stats
+from dependencies import user_dependency
+from exceptions import ForbiddenException
+from models import RoleEnum
+from schemas.utils_schema import CacheStatsSchema
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/cache", operation_id="get_cache_stats", status_code=status.HTTP_200_OK, response_model=Dict[str, CacheStatsSchema])
+async def get_cache_stats(user_data: user_dependency):
+    if user_data.role != RoleEnum.super_admin: raise ForbiddenException("Not authorized")
+    return cache_stats()
@@ -0,0 +1,16 @@
+from typing import List, Optional
+from uuid import UUID
+from fastapi import APIRouter, Query
+from starlette import status
+from dependencies import session_dependency
+from schemas.search_schema import SearchKindEnum, SearchOutSchema
+from services.search_service import SearchService
+
+search_service = SearchService()
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get("/{app_id}", operation_id="search_app", status_code=status.HTTP_200_OK, response_model=SearchOutSchema)
+async def search_app(app_id: UUID, session: session_dependency, q: str = Query(min_length=1, max_length=256), kinds: Optional[List[SearchKindEnum]] = Query(default=None), limit: int = Query(default=20, ge=1, le=100), cursor: Optional[str] = None):
+    return await search_service.search(app_id, q, session, kinds=kinds, limit=limit, cursor=cursor)
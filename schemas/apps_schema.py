@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import List, Optional
 from sqlmodel import SQLModel
 
 from schemas.base_schema import ID
@@ -20,5 +21,10 @@ class AppOutSchema(AppsSchema, ID):
     updated_at: datetime
 
 
+class AppPageSchema(SQLModel):
+    items: List[AppOutSchema]
+    next_cursor: Optional[str] = None
+
+
 class AppDeleteOutSchema(SQLModel, ID):
     status: str
@@ -18,3 +18,11 @@ class AuthResponseSchema(SQLModel):
 
 class RefreshBody(SQLModel):
     token: str
+
+
+class LogoutBody(SQLModel):
+    refresh_token: Optional[str] = None
+
+
+class LogoutResponseSchema(SQLModel):
+    status: str
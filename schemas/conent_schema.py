@@ -1,8 +1,8 @@
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 from uuid import UUID
 from pydantic import ConfigDict
-from sqlmodel import SQLModel
+from sqlmodel import Field, SQLModel
 
 
 class ContentCreateSchema(SQLModel):
@@ -16,13 +16,67 @@ class ContentUpdateSchema(SQLModel):
     data: Optional[Dict] = None
 
 
+class JsonPatchOperationSchema(SQLModel):
+    op: Literal["add", "remove", "replace", "move", "copy", "test"]
+    path: str
+    value: Optional[Any] = None
+    from_: Optional[str] = Field(default=None, schema_extra={"validation_alias": "from"})
+
+
+class ContentPredicateSchema(SQLModel):
+    path: str = Field(min_length=1)
+    op: Literal["eq", "ne", "gt", "gte", "lt", "lte", "in", "exists"] = "eq"
+    value: Optional[Any] = None
+
+
+class ContentQuerySchema(SQLModel):
+    contains: Optional[Dict] = None
+    where: List[ContentPredicateSchema] = []
+    parent_id: Optional[UUID] = None
+    sort: Optional[str] = None
+    order: Literal["asc", "desc"] = "asc"
+    limit: int = Field(default=100, ge=1, le=1000)
+    cursor: Optional[str] = None
+
+
+class ContentImportSchema(SQLModel):
+    name: str
+    data: Optional[Dict] = None
+    children: List["ContentImportSchema"] = []
+
+
+class ContentImportLineSchema(SQLModel):
+    id: str
+    parent_id: Optional[str] = None
+    name: str
+    data: Optional[Dict] = None
+
+
+class ContentImportConflictSchema(SQLModel):
+    ref: str
+    name: str
+    path: Optional[str] = None
+    reason: str
+
+
+class ContentImportResultSchema(SQLModel):
+    created: int
+    conflicts: List[ContentImportConflictSchema] = []
+
+
+class ContentMoveSchema(SQLModel):
+    parent_id: Optional[UUID] = None
+
+
 class ContentOutSchema(SQLModel):
     id: UUID
     app_id: UUID
     name: str
     slug: str
+    path: Optional[str] = None
     data: Optional[Dict] = None
     parent_id: Optional[UUID] = None
+    version: int = 1
     created_at: datetime
     updated_at: datetime
     children: List["ContentOutSchema"] = []
@@ -30,4 +84,10 @@ class ContentOutSchema(SQLModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+ContentImportSchema.model_rebuild()
 ContentOutSchema.model_rebuild()
+
+
+class ContentQueryOutSchema(SQLModel):
+    items: List[ContentOutSchema]
+    next_cursor: Optional[str] = None
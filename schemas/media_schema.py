@@ -1,4 +1,5 @@
-from typing import Dict, Optional
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
 from uuid import UUID
 from sqlmodel import Field, SQLModel
 from models import Media, MediaTypeEnum
@@ -29,6 +30,9 @@ class MediaResponse(SQLModel):
     alt_text: str | None
     caption: str | None
     is_public: bool
+    width: int | None = None
+    height: int | None = None
+    duration: float | None = None
 
     @classmethod
     def from_model(cls, media: Media, url: str | None):
@@ -39,5 +43,69 @@ class MediaResponse(SQLModel):
             url=url,
             alt_text=media.alt_text,
             caption=media.caption,
-            is_public=media.is_public
+            is_public=media.is_public,
+            width=media.width,
+            height=media.height,
+            duration=media.duration
         )
+
+
+class MediaPageSchema(SQLModel):
+    items: List[MediaResponse]
+    next_cursor: Optional[str] = None
+
+
+class MediaUploadInitiateSchema(SQLModel):
+    filename: str = Field(min_length=1, max_length=255)
+    content_type: str = Field(min_length=1, max_length=255)
+    size: int = Field(gt=0)
+    checksum_sha256: Optional[str] = Field(None, description="Base64 SHA-256 of the file for single PUT uploads, verified by storage. Multipart parts send x-amz-checksum-sha256 instead")
+    name: Optional[str] = Field(None, min_length=1, max_length=255)
+    is_public: bool = True
+    alt_text: Optional[str] = Field(None, min_length=1, max_length=512)
+    caption: Optional[str] = Field(None, min_length=1, max_length=2048)
+    meta: Optional[Dict] = None
+
+
+class MediaUploadPartUrlSchema(SQLModel):
+    part_number: int
+    url: str
+
+
+class MediaUploadInitiateOutSchema(SQLModel):
+    id: UUID
+    file_key: str
+    method: Literal["PUT", "multipart"]
+    url: Optional[str] = None
+    headers: Dict[str, str] = {}
+    part_size: Optional[int] = None
+    parts: List[MediaUploadPartUrlSchema] = []
+    expires_at: datetime
+
+
+class MediaUploadCompletedPartSchema(SQLModel):
+    part_number: int = Field(ge=1)
+    etag: str
+    checksum_sha256: str = Field(min_length=1, description="Base64 SHA-256 of the part, as sent in its x-amz-checksum-sha256 header")
+
+
+class MediaUploadFinalizeSchema(SQLModel):
+    parts: Optional[List[MediaUploadCompletedPartSchema]] = None
+
+
+class MediaBatchUploadResultSchema(SQLModel):
+    filename: str
+    status: Literal["created", "failed"] = "failed"
+    media: Optional[MediaResponse] = None
+    error: Optional[str] = None
+
+
+class MediaBulkDeleteSchema(SQLModel):
+    ids: Optional[List[UUID]] = None
+    media_type: Optional[MediaTypeEnum] = None
+    created_before: Optional[datetime] = None
+
+
+class MediaBulkDeleteOutSchema(SQLModel):
+    deleted: int
+    storage_pending: int
@@ -0,0 +1,23 @@
+from enum import Enum
+from typing import List, Optional
+from uuid import UUID
+from sqlmodel import SQLModel
+
+
+class SearchKindEnum(str, Enum):
+    content = "content"
+    media = "media"
+    document = "document"
+
+
+class SearchResultSchema(SQLModel):
+    kind: SearchKindEnum
+    id: UUID
+    name: str
+    rank: float
+    headline: Optional[str] = None
+
+
+class SearchOutSchema(SQLModel):
+    items: List[SearchResultSchema]
+    next_cursor: Optional[str] = None
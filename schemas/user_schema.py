@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 from pydantic import EmailStr
 from sqlmodel import SQLModel, Field
@@ -22,3 +22,8 @@ class UserCreateSchema(UserSchema):
 class UserOutSchema(UserSchema, ID):
     created_at: datetime
     updated_at: datetime
+
+
+class UserPageSchema(SQLModel):
+    items: List[UserOutSchema]
+    next_cursor: Optional[str] = None
@@ -8,3 +8,10 @@ class CurrentUser(SQLModel):
     host: str
     domain: str
     role: RoleEnum
+
+
+class CacheStatsSchema(SQLModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
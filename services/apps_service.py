@@ -1,13 +1,21 @@
+from typing import Optional
 from uuid import UUID
 from slugify import slugify
 from sqlmodel import and_, select
-from sqlalchemy.orm import joinedload
 from exceptions import ForbiddenException, NotFoundException, UnprocessableEntityException
 from models import App, User
-from schemas.apps_schema import AppCreateSchema
+from schemas.apps_schema import AppCreateSchema, AppOutSchema, AppPageSchema
 from sqlmodel.ext.asyncio.session import AsyncSession
 from schemas.utils_schema import CurrentUser
 from sqlalchemy.exc import IntegrityError
+from cache import CacheClient
+from cache.memory import named_cache
+from config import config
+from schemas.user_schema import UserPageSchema
+from services.helpers.pagination import next_page_cursor, paginate_by_created_at
+
+app_lookup_cache = named_cache("app_lookups", config.REFERENCE_CACHE_MAX_ENTRIES, config.REFERENCE_CACHE_TTL_SECONDS)
+app_exists_cache = named_cache("app_exists", config.REFERENCE_CACHE_MAX_ENTRIES, config.REFERENCE_CACHE_TTL_SECONDS)
 
 
 class AppsService:
@@ -17,26 +25,33 @@ class AppsService:
         except ValueError: is_uuid = False
         return is_uuid
 
-    async def get_app_by_id_or_slug(self, key: UUID | str, user_data: CurrentUser, session: AsyncSession):
+    async def get_app_by_id_or_slug(self, key: UUID | str, user_data: CurrentUser, session: AsyncSession, cache: CacheClient):
         if not user_data.id: raise UnprocessableEntityException("User data not available")
+        version = await cache.get_version("apps")
+        cached = app_lookup_cache.get((version, user_data.id, str(key)))
+        if cached is not None: return cached
         is_uuid = self.__isUUID(key)
         id_or_slug = App.id == str(key) if is_uuid else App.slug == key
-        query = select(App).join(App.users).where(and_(User.id == user_data.id, id_or_slug)).options(joinedload(App.users))
+        query = select(App).join(App.users).where(and_(User.id == user_data.id, id_or_slug))
         result = await session.exec(query)
         app = result.first()
-        return app
+        if not app: return None
+        app_out = AppOutSchema.model_validate(app)
+        app_lookup_cache.set((version, user_data.id, str(key)), app_out)
+        return app_out
 
-    async def get_apps(self, user_data: CurrentUser, session: AsyncSession):
+    async def get_apps(self, user_data: CurrentUser, session: AsyncSession, limit: int = 100, cursor: Optional[str] = None):
         if not user_data.id: raise UnprocessableEntityException("User data not available")
-        query = select(App).join(App.users).where(User.id == user_data.id).options(joinedload(App.users))
-        result = await session.exec(query)
-        apps = result.unique().all()
-        return apps
+        query = select(App).join(App.users).where(User.id == user_data.id)
+        result = await session.exec(paginate_by_created_at(query, App.created_at, App.id, limit, cursor))
+        apps = result.all()
+        return AppPageSchema(items=apps[:limit], next_cursor=next_page_cursor(apps, limit))
 
-    async def get_app_users(self, app_id: UUID, session: AsyncSession):
+    async def get_app_users(self, app_id: UUID, session: AsyncSession, limit: int = 100, cursor: Optional[str] = None):
         query = select(User).join(User.apps).where(App.id == str(app_id))
-        result = await session.exec(query)
-        return result.unique().all()
+        result = await session.exec(paginate_by_created_at(query, User.created_at, User.id, limit, cursor))
+        users = result.all()
+        return UserPageSchema(items=users[:limit], next_cursor=next_page_cursor(users, limit))
 
     async def create_app(self, app_data: AppCreateSchema, user_data: CurrentUser, session: AsyncSession):
         try:
@@ -60,4 +75,9 @@ class AppsService:
         if not app: raise NotFoundException("App not found")
         await session.delete(app)
         await session.commit()
+        self.invalidate_app(id)
         return True
+
+    def invalidate_app(self, id: UUID):
+        app_exists_cache.evict(lambda key, exists: key[1] == str(id))
+        app_lookup_cache.evict(lambda key, app: app.id == id)
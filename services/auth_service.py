@@ -1,8 +1,14 @@
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 from jose import ExpiredSignatureError, JWTError, jwt
+from cache import CacheClient
+from cache.memory import named_cache
 from config import config
 from exceptions import UnauthorizedException
 
+verified_token_cache = named_cache("verified_tokens", config.TOKEN_CACHE_MAX_ENTRIES)
+
 
 class AuthService:
     def create_access_token(self, data: dict, expires_delta: timedelta = timedelta(minutes=30)):
@@ -19,7 +25,23 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, config.JWT_SECRET, algorithm=config.JWT_ALGORITHM)
         return encoded_jwt
 
-    def verify_token(self, token: str):
-        try: return jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
+    def __token_digest(self, token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    async def verify_token(self, token: str, cache: CacheClient):
+        digest = self.__token_digest(token)
+        if await cache.has_flag(f"revoked_token:{digest}"): raise UnauthorizedException("Token has been revoked")
+        payload = verified_token_cache.get(digest)
+        if payload is not None: return dict(payload)
+        try: payload = jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
         except ExpiredSignatureError: raise UnauthorizedException("Token has expired")
         except JWTError: raise UnauthorizedException("Invalid token")
+        if isinstance(payload.get("exp"), (int, float)): verified_token_cache.set(digest, dict(payload), payload["exp"] - time.time())
+        return payload
+
+    async def revoke_token(self, token: str, cache: CacheClient):
+        payload = await self.verify_token(token, cache)
+        digest = self.__token_digest(token)
+        await cache.set_flag(f"revoked_token:{digest}", payload["exp"] - time.time() if isinstance(payload.get("exp"), (int, float)) else None)
+        verified_token_cache.delete(digest)
+        return payload
@@ -1,46 +1,142 @@
+from typing import Any, AsyncIterator, List, Optional
 from uuid import UUID
 from slugify import slugify
-from sqlalchemy.exc import IntegrityError
-from sqlmodel import select, asc
-from exceptions import BadRequestException, InternalServerError, NotFoundException, UnprocessableEntityException
-from models import Content
-from schemas.conent_schema import ContentCreateSchema, ContentUpdateSchema
+from sqlalchemy import case, func, literal, or_, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+from config import config
+from database import async_session
+from exceptions import BadRequestException, ConflictException, InternalServerError, NotFoundException, PreconditionFailedException, UnprocessableEntityException
+from models import App, Content, default_time, generate_uuid
+from schemas.conent_schema import ContentCreateSchema, ContentImportConflictSchema, ContentImportLineSchema, ContentImportResultSchema, ContentImportSchema, ContentOutSchema, ContentQueryOutSchema, ContentQuerySchema, ContentUpdateSchema
+from services.helpers.content_patch_helper import ContentPatchHelper
+from services.helpers.content_query_helper import ContentQueryHelper
 from sqlmodel.ext.asyncio.session import AsyncSession
+from utils import encode_cursor
 
+CONTENT_OUT_COLUMNS = ("id", "app_id", "name", "slug", "path", "data", "parent_id", "version", "created_at", "updated_at")
+CONTENT_EXPORT_COLUMNS = ("id", "parent_id", "name", "slug", "path", "data", "created_at", "updated_at")
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+PATH_SEPARATOR = "/"
+
+
+class ContentService(ContentPatchHelper, ContentQueryHelper):
+    def _normalize_path(self, path: str) -> str:
+        segments = [segment for segment in path.strip().split(PATH_SEPARATOR) if segment]
+        if not segments: raise BadRequestException(detail="Content path cannot be empty")
+        return PATH_SEPARATOR.join(segments)
+
+    def _out_columns(self, entity=Content):
+        return [getattr(entity, column) for column in CONTENT_OUT_COLUMNS]
+
+    def _content_out(self, row, **extra) -> ContentOutSchema:
+        return ContentOutSchema(**{column: row[column] for column in CONTENT_OUT_COLUMNS}, **extra)
+
+    def _path_depth(self):
+        return func.length(Content.path) - func.length(func.replace(Content.path, PATH_SEPARATOR, ""))
+
+    def _subtree_filter(self, path: str):
+        return or_(Content.path == path, Content.path.startswith(f"{path}{PATH_SEPARATOR}", autoescape=True))
+
+    async def backfill_paths(self, app_id: UUID, session: AsyncSession) -> int:
+        anchor = select(Content.id, Content.slug.label("path")).where(Content.app_id == str(app_id), Content.parent_id == None)
+        tree = anchor.cte("content_paths", recursive=True)
+        child = aliased(Content, name="child")
+        tree = tree.union_all(select(child.id, tree.c.path + literal(PATH_SEPARATOR) + child.slug).join(tree, child.parent_id == tree.c.id))
+        statement = update(Content).where(Content.id == tree.c.id, Content.path == None).values(path=tree.c.path, version=Content.version + 1)
+        result = await session.exec(statement.execution_options(synchronize_session=False))
+        return result.rowcount
+
+    async def _ensure_paths(self, app_id: UUID, session: AsyncSession) -> None:
+        missing = await session.exec(select(Content.id).where(Content.app_id == str(app_id), Content.path == None).limit(1))
+        if missing.first() is not None: await self.backfill_paths(app_id, session)
+
+    async def _get_parent_path(self, app_id: UUID, parent_id: UUID, session: AsyncSession) -> str:
+        result = await session.exec(select(Content.path).where(Content.app_id == str(app_id), Content.id == str(parent_id)))
+        parent_path = result.one_or_none()
+        if parent_path is None: raise NotFoundException(detail="Parent content not found")
+        return parent_path
+
+    async def _rewrite_subtree_paths(self, app_id: UUID, old_path: str, new_path: str, session: AsyncSession):
+        statement = update(Content).where(Content.app_id == str(app_id), Content.path.startswith(f"{old_path}{PATH_SEPARATOR}", autoescape=True))
+        statement = statement.values(path=literal(new_path) + func.substr(Content.path, len(old_path) + 1), version=Content.version + 1).execution_options(synchronize_session=False)
+        await session.exec(statement)
 
-class ContentService:
     async def create_content(self, app_id: UUID, content_data: ContentCreateSchema, session: AsyncSession):
+        slug = slugify(content_data.name, separator="-")
+        parent_id = str(content_data.parent_id) if content_data.parent_id else None
+        if parent_id: await self._ensure_paths(app_id, session)
+        path = f"{await self._get_parent_path(app_id, parent_id, session)}{PATH_SEPARATOR}{slug}" if parent_id else slug
         try:
-            slug = slugify(content_data.name, separator="-")
-            parent_id = str(content_data.parent_id) if content_data.parent_id else None
-            content = Content(app_id=str(app_id), slug=slug, parent_id=parent_id, name=content_data.name, data=content_data.data)
+            content = Content(app_id=str(app_id), slug=slug, path=path, parent_id=parent_id, name=content_data.name, data=content_data.data)
             session.add(content)
             await session.commit()
             await session.refresh(content)
             return content
         except IntegrityError as e:
             await session.rollback()
-            if "slug" in str(e): raise UnprocessableEntityException(detail="Duplicate content name")
+            if "slug" in str(e) or "path" in str(e): raise UnprocessableEntityException(detail="Duplicate content name")
         except Exception as e:
             await session.rollback()
             raise InternalServerError(detail=str(e))
 
-    async def get_content(self, app_id: UUID, session: AsyncSession):
-        statement = select(Content).where(Content.app_id == str(app_id), Content.parent_id == None).order_by(asc(Content.created_at))
+    def _build_tree(self, rows) -> List[ContentOutSchema]:
+        nodes: dict[str, ContentOutSchema] = {}
+        roots: List[ContentOutSchema] = []
+        for row in rows:
+            node = self._content_out(row, children=[])
+            nodes[row["id"]] = node
+            parent = nodes.get(row["parent_id"])
+            if parent is None: roots.append(node)
+            else: parent.children.append(node)
+        return roots
+
+    async def get_content(self, app_id: UUID, session: AsyncSession, parent_id: Optional[UUID] = None, max_depth: Optional[int] = None) -> List[ContentOutSchema]:
+        root_filter = Content.parent_id == str(parent_id) if parent_id else Content.parent_id == None
+        anchor = select(*self._out_columns(), literal(0).label("depth")).where(Content.app_id == str(app_id), root_filter)
+        tree = anchor.cte("content_tree", recursive=True)
+        child = aliased(Content, name="child")
+        recursive = select(*self._out_columns(child), (tree.c.depth + 1).label("depth")).join(tree, child.parent_id == tree.c.id)
+        if max_depth is not None: recursive = recursive.where(tree.c.depth < max_depth)
+        tree = tree.union_all(recursive)
+        statement = select(*tree.c).order_by(tree.c.depth, tree.c.created_at)
         result = await session.exec(statement)
-        return result.all()
+        return self._build_tree(result.mappings())
+
+    async def get_content_fingerprint(self, app_id: UUID, session: AsyncSession) -> tuple:
+        revision = func.concat(Content.id, ":", Content.version, ":", Content.updated_at)
+        result = await session.exec(select(func.count(), func.md5(func.string_agg(revision, aggregate_order_by(literal(","), Content.id)))).where(Content.app_id == str(app_id)))
+        return tuple(result.one())
+
+    async def query_content(self, app_id: UUID, query: ContentQuerySchema, session: AsyncSession) -> ContentQueryOutSchema:
+        sort_key = self._query_sort_key(query)
+        statement = select(*self._out_columns(), sort_key.label("sort_key")).where(Content.app_id == str(app_id), *self._query_filters(query))
+        if query.cursor: statement = statement.where(self._query_keyset_filter(query, sort_key))
+        ordering = [sort_key.desc(), Content.id.desc()] if query.order == "desc" else [sort_key.asc(), Content.id.asc()]
+        result = await session.exec(statement.order_by(*ordering).limit(query.limit + 1))
+        rows = result.mappings().all()
+        next_cursor = encode_cursor(rows[query.limit - 1]["sort_key"], rows[query.limit - 1]["id"]) if len(rows) > query.limit else None
+        return ContentQueryOutSchema(items=[self._content_out(row) for row in rows[:query.limit]], next_cursor=next_cursor)
 
     async def update_content(self, app_id: UUID, content_id: UUID, data: ContentUpdateSchema, session: AsyncSession):
         try:
             print(data)
+            if data.name: await self._ensure_paths(app_id, session)
             statement = select(Content).where(Content.app_id == str(app_id), Content.id == str(content_id))
             result = await session.exec(statement)
             content = result.one_or_none()
             if not content: raise NotFoundException(detail="Content not found")
             if data.name:
+                old_path = content.path
                 content.name = data.name
                 content.slug = slugify(data.name, separator="-")
+                content.path = PATH_SEPARATOR.join([*old_path.split(PATH_SEPARATOR)[:-1], content.slug])
+                if content.path != old_path: await self._rewrite_subtree_paths(app_id, old_path, content.path, session)
             content.data = data.data if data.data else {}
+            content.version += 1
             session.add(content)
             await session.commit()
             await session.refresh(content)
@@ -49,6 +145,77 @@ class ContentService:
             await session.rollback()
             raise BadRequestException(detail=str(ie))
 
+    async def patch_content(self, app_id: UUID, content_id: UUID, patch: Any, patch_type: str, session: AsyncSession, if_match: Optional[int] = None) -> ContentOutSchema:
+        if patch_type == "merge" and not isinstance(patch, dict): raise UnprocessableEntityException(detail="Merge patch must be a JSON object")
+        if patch_type != "merge" and len(patch) > config.CONTENT_PATCH_MAX_OPERATIONS: raise UnprocessableEntityException(detail=f"JSON Patch cannot contain more than {config.CONTENT_PATCH_MAX_OPERATIONS} operations")
+        steps = select(Content.id.label("id"), func.coalesce(Content.data, self._jsonb({})).label("document")).where(Content.app_id == str(app_id), Content.id == str(content_id)).with_for_update().cte("patch_0").prefix_with("MATERIALIZED")
+        if patch_type == "merge": steps = select(steps.c.id, self._merge_patch_expression(steps.c.document, patch).label("document")).cte("patch_1").prefix_with("MATERIALIZED")
+        else:
+            for index, operation in enumerate(patch, start=1): steps = select(steps.c.id, self._json_patch_expression(steps.c.document, operation).label("document")).cte(f"patch_{index}").prefix_with("MATERIALIZED")
+        statement = update(Content).where(Content.id == steps.c.id, steps.c.document.is_not(None))
+        if if_match is not None: statement = statement.where(Content.version == if_match)
+        statement = statement.values(data=steps.c.document, version=Content.version + 1).returning(*self._out_columns())
+        try:
+            result = await session.exec(statement.execution_options(synchronize_session=False))
+            row = result.mappings().one_or_none()
+            await session.commit()
+        except DBAPIError as e:
+            await session.rollback()
+            raise UnprocessableEntityException(detail=f"Patch could not be applied: {e.orig}")
+        if row is not None: return self._content_out(row)
+        result = await session.exec(select(Content.version).where(Content.app_id == str(app_id), Content.id == str(content_id)))
+        version = result.one_or_none()
+        if version is None: raise NotFoundException(detail="Content not found")
+        if if_match is not None and version != if_match: raise PreconditionFailedException(detail="Content version does not match If-Match")
+        raise ConflictException(detail="Patch could not be applied to the current document")
+
+    async def get_content_by_path(self, app_id: UUID, path: str, session: AsyncSession) -> ContentOutSchema:
+        statement = select(*self._out_columns()).where(Content.app_id == str(app_id), Content.path == self._normalize_path(path))
+        result = await session.exec(statement)
+        row = result.mappings().one_or_none()
+        if row is None: raise NotFoundException(detail="Content not found")
+        return self._content_out(row)
+
+    async def get_content_ancestors(self, app_id: UUID, path: str, session: AsyncSession) -> List[ContentOutSchema]:
+        segments = self._normalize_path(path).split(PATH_SEPARATOR)
+        prefixes = [PATH_SEPARATOR.join(segments[:index]) for index in range(1, len(segments))]
+        if not prefixes: return []
+        statement = select(*self._out_columns()).where(Content.app_id == str(app_id), Content.path.in_(prefixes)).order_by(func.length(Content.path))
+        result = await session.exec(statement)
+        return [self._content_out(row) for row in result.mappings()]
+
+    async def get_content_subtree(self, app_id: UUID, path: str, session: AsyncSession, max_depth: Optional[int] = None) -> ContentOutSchema:
+        path = self._normalize_path(path)
+        statement = select(*self._out_columns()).where(Content.app_id == str(app_id), self._subtree_filter(path))
+        if max_depth is not None: statement = statement.where(self._path_depth() <= path.count(PATH_SEPARATOR) + max_depth)
+        statement = statement.order_by(self._path_depth(), Content.created_at)
+        result = await session.exec(statement)
+        roots = self._build_tree(result.mappings())
+        if not roots: raise NotFoundException(detail="Content not found")
+        return roots[0]
+
+    async def move_content(self, app_id: UUID, content_id: UUID, parent_id: Optional[UUID], session: AsyncSession) -> ContentOutSchema:
+        ids = [str(content_id), str(parent_id)] if parent_id else [str(content_id)]
+        await self._ensure_paths(app_id, session)
+        result = await session.exec(select(Content.id, Content.slug, Content.path).where(Content.app_id == str(app_id), Content.id.in_(ids)))
+        nodes = {row.id: row for row in result.all()}
+        content = nodes.get(str(content_id))
+        if content is None: raise NotFoundException(detail="Content not found")
+        parent = nodes.get(str(parent_id)) if parent_id else None
+        if parent_id and parent is None: raise NotFoundException(detail="Parent content not found")
+        if parent and (parent.id == content.id or parent.path.startswith(f"{content.path}{PATH_SEPARATOR}")): raise BadRequestException(detail="Cannot move content into its own subtree")
+        new_path = f"{parent.path}{PATH_SEPARATOR}{content.slug}" if parent else content.slug
+        try:
+            statement = update(Content).where(Content.app_id == str(app_id), self._subtree_filter(content.path))
+            statement = statement.values(path=literal(new_path) + func.substr(Content.path, len(content.path) + 1), parent_id=case((Content.id == content.id, parent.id if parent else None), else_=Content.parent_id), version=Content.version + 1)
+            await session.exec(statement.execution_options(synchronize_session=False))
+            await session.commit()
+        except IntegrityError as e:
+            await session.rollback()
+            if "slug" in str(e) or "path" in str(e): raise UnprocessableEntityException(detail="Duplicate content name")
+            raise BadRequestException(detail=str(e))
+        return await self.get_content_by_path(app_id, new_path, session)
+
     async def export_content(self, app_id: UUID, content_id: UUID, session: AsyncSession):
         try:
             statement = select(Content).where(Content.app_id == str(app_id), Content.id == str(content_id))
@@ -60,3 +227,83 @@ class ContentService:
         except IntegrityError as ie:
             await session.rollback()
             raise BadRequestException(detail=str(ie))
+
+    async def stream_app_content(self, app_id: UUID, session: AsyncSession) -> AsyncIterator[dict]:
+        if await session.get(App, str(app_id)) is None: raise NotFoundException(detail="App not found")
+        columns = [getattr(Content, column) for column in CONTENT_EXPORT_COLUMNS]
+        statement = select(*columns).where(Content.app_id == str(app_id)).order_by(Content.path.collate("C")).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+        async def rows():
+            async with async_session() as stream_session:
+                result = await stream_session.stream(statement)
+                async for row in result.mappings(): yield dict(row)
+        return rows()
+
+    def flatten_import_tree(self, nodes: List[ContentImportSchema]) -> List[ContentImportLineSchema]:
+        lines: List[ContentImportLineSchema] = []
+        stack = [(str(index), None, node) for index, node in reversed(list(enumerate(nodes)))]
+        while stack:
+            ref, parent_ref, node = stack.pop()
+            lines.append(ContentImportLineSchema(id=ref, parent_id=parent_ref, name=node.name, data=node.data))
+            stack.extend((f"{ref}.{index}", ref, child) for index, child in reversed(list(enumerate(node.children))))
+        return lines
+
+    async def import_content(self, app_id: UUID, lines: List[ContentImportLineSchema], session: AsyncSession, parent_id: Optional[UUID] = None) -> ContentImportResultSchema:
+        if await session.get(App, str(app_id)) is None: raise NotFoundException(detail="App not found")
+        await self._ensure_paths(app_id, session)
+        root_path = await self._get_parent_path(app_id, parent_id, session) if parent_id else None
+        conflicts: List[ContentImportConflictSchema] = []
+        nodes: dict[str, ContentImportLineSchema] = {}
+        for line in lines:
+            if line.id in nodes: conflicts.append(ContentImportConflictSchema(ref=line.id, name=line.name, reason="duplicate_ref"))
+            else: nodes[line.id] = line
+        external_refs = {line.parent_id for line in nodes.values() if line.parent_id and line.parent_id not in nodes}
+        placed: dict[str, tuple[Optional[str], Optional[str]]] = {None: (str(parent_id) if parent_id else None, root_path)}
+        if external_refs:
+            result = await session.exec(select(Content.id, Content.path).where(Content.app_id == str(app_id), Content.id.in_(external_refs)))
+            placed.update({row.id: (row.id, row.path) for row in result.all()})
+        children: dict[Optional[str], List[ContentImportLineSchema]] = {}
+        for line in nodes.values(): children.setdefault(line.parent_id, []).append(line)
+        slugs: dict[str, str] = {}
+        created = 0
+        level = [line for ref in placed for line in children.get(ref, [])]
+        try:
+            while level:
+                rows, row_refs, next_level = [], {}, []
+                for line in level:
+                    db_parent_id, parent_path = placed[line.parent_id]
+                    slug = slugs.get(line.name) or slugs.setdefault(line.name, slugify(line.name, separator="-"))
+                    row_id, now = generate_uuid(), default_time()
+                    path = f"{parent_path}{PATH_SEPARATOR}{slug}" if parent_path else slug
+                    rows.append({"id": row_id, "app_id": str(app_id), "name": line.name, "slug": slug, "path": path, "data": line.data, "parent_id": db_parent_id, "created_at": now, "updated_at": now})
+                    row_refs[row_id] = line
+                inserted = set()
+                for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+                    statement = insert(Content).values(rows[start:start + IMPORT_BATCH_SIZE]).on_conflict_do_nothing().returning(Content.id)
+                    result = await session.exec(statement)
+                    inserted.update(result.scalars().all())
+                for row in rows:
+                    line = row_refs[row["id"]]
+                    if row["id"] not in inserted:
+                        conflicts.append(ContentImportConflictSchema(ref=line.id, name=line.name, path=row["path"], reason="duplicate_slug"))
+                        conflicts.extend(self._skipped_descendants(line.id, children))
+                        continue
+                    placed[line.id] = (row["id"], row["path"])
+                    next_level.extend(children.get(line.id, []))
+                created += len(inserted)
+                level = next_level
+            await session.commit()
+        except IntegrityError as e:
+            await session.rollback()
+            raise BadRequestException(detail=str(e))
+        reached = set(placed) | {conflict.ref for conflict in conflicts}
+        conflicts.extend(ContentImportConflictSchema(ref=line.id, name=line.name, reason="parent_not_found") for line in nodes.values() if line.id not in reached)
+        return ContentImportResultSchema(created=created, conflicts=conflicts)
+
+    def _skipped_descendants(self, ref: str, children: dict) -> List[ContentImportConflictSchema]:
+        skipped, stack = [], list(children.get(ref, []))
+        while stack:
+            line = stack.pop()
+            skipped.append(ContentImportConflictSchema(ref=line.id, name=line.name, reason="parent_conflict"))
+            stack.extend(children.get(line.id, []))
+        return skipped
@@ -0,0 +1,64 @@
+from typing import Any, List
+from sqlalchemy import Text, case, func, literal, null
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from exceptions import UnprocessableEntityException
+from schemas.conent_schema import JsonPatchOperationSchema
+
+
+class ContentPatchHelper:
+    def _jsonb(self, value: Any):
+        return literal(value, JSONB)
+
+    def _parse_pointer(self, pointer: str) -> List[str]:
+        if pointer == "": return []
+        if not pointer.startswith("/"): raise UnprocessableEntityException(detail=f"Invalid JSON pointer: {pointer}")
+        return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+    def _get(self, document, path: List[str]):
+        if not path: return document
+        return document.op("#>", return_type=JSONB)(literal(path, ARRAY(Text)))
+
+    def _require(self, document, path: List[str], expression):
+        if not path: return expression
+        return case((self._get(document, path).is_(None), null()), else_=expression)
+
+    def _add(self, document, path: List[str], value):
+        if not path: return value
+        parent, last = self._get(document, path[:-1]), path[-1]
+        if last == "-": array_value = func.jsonb_insert(document, literal([*path[:-1], "-1"], ARRAY(Text)), value, True, type_=JSONB)
+        elif last.isdigit(): array_value = case((func.jsonb_array_length(parent) >= int(last), func.jsonb_insert(document, literal(path, ARRAY(Text)), value, type_=JSONB)), else_=null())
+        else: array_value = null()
+        object_value = func.jsonb_set(document, literal(path, ARRAY(Text)), value, True, type_=JSONB)
+        return case((func.jsonb_typeof(parent) == "array", array_value), (func.jsonb_typeof(parent) == "object", object_value), else_=null())
+
+    def _remove(self, document, path: List[str]):
+        if not path: raise UnprocessableEntityException(detail="Cannot remove the document root")
+        return self._require(document, path, document.op("#-", return_type=JSONB)(literal(path, ARRAY(Text))))
+
+    def _replace(self, document, path: List[str], value):
+        if not path: return value
+        return self._require(document, path, func.jsonb_set(document, literal(path, ARRAY(Text)), value, False, type_=JSONB))
+
+    def _merge_patch_expression(self, target, patch: dict):
+        document = case((func.jsonb_typeof(target) == "object", target), else_=self._jsonb({}))
+        for key in [key for key, value in patch.items() if value is None]: document = document.op("-", return_type=JSONB)(literal(key))
+        scalars = {key: value for key, value in patch.items() if value is not None and not isinstance(value, dict)}
+        if scalars: document = document.op("||", return_type=JSONB)(self._jsonb(scalars))
+        for key, value in patch.items():
+            if not isinstance(value, dict): continue
+            nested = self._merge_patch_expression(target.op("->", return_type=JSONB)(literal(key)), value)
+            document = document.op("||", return_type=JSONB)(func.jsonb_build_object(literal(key), nested, type_=JSONB))
+        return document
+
+    def _json_patch_expression(self, document, operation: JsonPatchOperationSchema):
+        path = self._parse_pointer(operation.path)
+        if operation.op in ("add", "replace", "test") and "value" not in operation.model_fields_set: raise UnprocessableEntityException(detail=f"Operation '{operation.op}' requires a value")
+        if operation.op == "add": return self._add(document, path, self._jsonb(operation.value))
+        if operation.op == "remove": return self._remove(document, path)
+        if operation.op == "replace": return self._replace(document, path, self._jsonb(operation.value))
+        if operation.op == "test": return case((self._get(document, path) == self._jsonb(operation.value), document), else_=null())
+        if operation.from_ is None: raise UnprocessableEntityException(detail=f"Operation '{operation.op}' requires a from pointer")
+        source = self._parse_pointer(operation.from_)
+        if operation.op == "move" and path[:len(source)] == source and len(path) > len(source): raise UnprocessableEntityException(detail="Cannot move a value into one of its children")
+        base = self._remove(document, source) if operation.op == "move" else document
+        return self._require(document, source, self._add(base, path, self._get(document, source)))
@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import Any, List
+from sqlalchemy import Text, and_, func, literal, literal_column, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from exceptions import BadRequestException
+from models import Content
+from schemas.conent_schema import ContentPredicateSchema, ContentQuerySchema
+from utils import decode_cursor
+
+JSON_PATH_SEPARATOR = "."
+COMPARISON_OPERATORS = {"gt": "__gt__", "gte": "__ge__", "lt": "__lt__", "lte": "__le__"}
+JSON_NULL = literal_column("'null'::jsonb", JSONB)
+
+
+class ContentQueryHelper:
+    def _json_path(self, path: str) -> List[str]:
+        segments = path.split(JSON_PATH_SEPARATOR)
+        if not all(segments): raise BadRequestException(detail=f"Invalid JSON path: {path}")
+        return segments
+
+    def _data_at(self, path: List[str]):
+        return Content.data.op("#>", return_type=JSONB)(literal(path, ARRAY(Text)))
+
+    def _nest(self, path: List[str], value: Any) -> dict:
+        for segment in reversed(path[1:]): value = {segment: value}
+        return {path[0]: value}
+
+    def _predicate_filter(self, predicate: ContentPredicateSchema):
+        path = self._json_path(predicate.path)
+        value = self._data_at(path)
+        if predicate.op == "exists": return value.is_(None) if predicate.value is False else value.is_not(None)
+        if predicate.op == "in":
+            if not isinstance(predicate.value, list) or not predicate.value: raise BadRequestException(detail="The 'in' operator requires a non-empty list")
+            return value.in_([literal(item, JSONB) for item in predicate.value])
+        expected = literal(predicate.value, JSONB)
+        if predicate.op == "eq" and not isinstance(predicate.value, (dict, list)): return Content.data.op("@>")(literal(self._nest(path, predicate.value), JSONB))
+        if predicate.op == "eq": return value == expected
+        if predicate.op == "ne": return value.is_distinct_from(expected)
+        return and_(func.jsonb_typeof(value) == func.jsonb_typeof(expected), getattr(value, COMPARISON_OPERATORS[predicate.op])(expected))
+
+    def _query_filters(self, query: ContentQuerySchema) -> list:
+        filters = [self._predicate_filter(predicate) for predicate in query.where]
+        if query.contains: filters.append(Content.data.op("@>")(literal(query.contains, JSONB)))
+        if query.parent_id: filters.append(Content.parent_id == str(query.parent_id))
+        return filters
+
+    def _query_sort_key(self, query: ContentQuerySchema):
+        if not query.sort: return Content.created_at
+        return func.coalesce(self._data_at(self._json_path(query.sort)), JSON_NULL)
+
+    def _query_keyset_filter(self, query: ContentQuerySchema, sort_key):
+        last_value, last_id = decode_cursor(query.cursor, 2)
+        if not isinstance(last_id, str): raise BadRequestException(detail="Invalid cursor")
+        if not query.sort:
+            try: last_value = datetime.fromisoformat(last_value)
+            except (TypeError, ValueError): raise BadRequestException(detail="Invalid cursor")
+        else: last_value = JSON_NULL if last_value is None else literal(last_value, JSONB)
+        position, last_position = tuple_(sort_key, Content.id), tuple_(last_value, last_id)
+        return position < last_position if query.order == "desc" else position > last_position
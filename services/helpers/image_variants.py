@@ -0,0 +1,38 @@
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Optional
+from PIL import Image, ImageOps
+from config import config
+from models import ImageFormatEnum
+
+VARIANT_FORMATS = {ImageFormatEnum.jpeg: ("JPEG", "image/jpeg"), ImageFormatEnum.png: ("PNG", "image/png"), ImageFormatEnum.webp: ("WEBP", "image/webp")}
+
+variant_pool: Optional[ProcessPoolExecutor] = None
+
+
+class VariantSourceTooLargeError(ValueError):
+    pass
+
+
+def get_variant_pool() -> ProcessPoolExecutor:
+    global variant_pool
+    if variant_pool is None: variant_pool = ProcessPoolExecutor(max_workers=config.MEDIA_VARIANT_WORKERS)
+    return variant_pool
+
+
+def shutdown_variant_pool() -> None:
+    global variant_pool
+    if variant_pool is not None: variant_pool.shutdown(wait=False, cancel_futures=True)
+    variant_pool = None
+
+
+def render_variant(path: str, width: int, height: int, image_format: ImageFormatEnum, quality: int, max_pixels: int) -> bytes:
+    with Image.open(path) as source:
+        if source.size[0] * source.size[1] > max_pixels: raise VariantSourceTooLargeError(f"Image has more than {max_pixels} pixels")
+        source.draft("RGB" if source.mode not in ("L", "1") else source.mode, (max(width, height), max(width, height)))
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((width, height), Image.Resampling.LANCZOS)
+        if image_format == ImageFormatEnum.jpeg and image.mode not in ("RGB", "L"): image = image.convert("RGB")
+        output = BytesIO()
+        image.save(output, format=VARIANT_FORMATS[image_format][0], quality=quality, optimize=True)
+        return output.getvalue()
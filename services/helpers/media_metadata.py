@@ -0,0 +1,191 @@
+import struct
+from typing import Callable, Optional
+
+HEAD_SIZE = 256 * 1024
+MAX_BOX_READ = 16 * 1024 * 1024
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+MP3_BITRATES = {1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320), 2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)}
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+RangeReader = Callable[[int, int], bytes]
+
+
+class ByteSource:
+    def __init__(self, read_range: RangeReader, size: int):
+        self.read_range = read_range
+        self.size = size
+        self.head = read_range(0, min(size, HEAD_SIZE)) if size > 0 else b""
+
+    def read(self, offset: int, length: int) -> bytes:
+        if offset < 0 or offset >= self.size or length <= 0: return b""
+        if offset + length <= len(self.head): return self.head[offset:offset + length]
+        return self.read_range(offset, min(length, self.size - offset))
+
+
+def png_dimensions(head: bytes) -> Optional[tuple[int, int]]:
+    if len(head) < 24 or not head.startswith(b"\x89PNG\r\n\x1a\n") or head[12:16] != b"IHDR": return None
+    return struct.unpack(">II", head[16:24])
+
+
+def gif_dimensions(head: bytes) -> Optional[tuple[int, int]]:
+    if len(head) < 10 or head[:6] not in (b"GIF87a", b"GIF89a"): return None
+    return struct.unpack("<HH", head[6:10])
+
+
+def webp_dimensions(head: bytes) -> Optional[tuple[int, int]]:
+    if len(head) < 30 or head[:4] != b"RIFF" or head[8:12] != b"WEBP": return None
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and head[20] == 0x2F:
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X": return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    return None
+
+
+def jpeg_dimensions(source: ByteSource) -> Optional[tuple[int, int]]:
+    if not source.head.startswith(b"\xff\xd8"): return None
+    offset = 2
+    while offset < source.size:
+        marker = source.read(offset, 9)
+        if len(marker) < 4 or marker[0] != 0xFF: return None
+        if marker[1] == 0xFF:
+            offset += 1
+            continue
+        if marker[1] in JPEG_STANDALONE_MARKERS:
+            offset += 2
+            continue
+        if marker[1] in JPEG_SOF_MARKERS:
+            if len(marker) < 9: return None
+            height, width = struct.unpack(">HH", marker[5:9])
+            return width, height
+        offset += 2 + struct.unpack(">H", marker[2:4])[0]
+    return None
+
+
+def _mp4_boxes(source: ByteSource, start: int, end: int):
+    offset = start
+    while offset + 8 <= end:
+        header = source.read(offset, 16)
+        if len(header) < 8: return
+        size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if size == 1:
+            if len(header) < 16: return
+            size, header_size = struct.unpack(">Q", header[8:16])[0], 16
+        elif size == 0: size = end - offset
+        if size < header_size: return
+        yield box_type, offset + header_size, offset + size
+        offset += size
+
+
+def mp4_duration(source: ByteSource) -> Optional[float]:
+    if source.head[4:8] != b"ftyp": return None
+    for box_type, start, end in _mp4_boxes(source, 0, source.size):
+        if box_type != b"moov": continue
+        moov = source.read(start, min(end - start, MAX_BOX_READ))
+        moov_source = ByteSource(lambda offset, length: moov[offset:offset + length], len(moov))
+        for child_type, child_start, _ in _mp4_boxes(moov_source, 0, len(moov)):
+            if child_type != b"mvhd": continue
+            if moov[child_start] == 1: timescale, duration = struct.unpack(">IQ", moov[child_start + 20:child_start + 32])
+            else: timescale, duration = struct.unpack(">II", moov[child_start + 12:child_start + 20])
+            return duration / timescale if timescale else None
+        return None
+    return None
+
+
+def wav_duration(source: ByteSource) -> Optional[float]:
+    head = source.head
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE": return None
+    offset, byte_rate = 12, None
+    while offset + 8 <= source.size:
+        chunk_id, chunk_size = struct.unpack("<4sI", source.read(offset, 8))
+        if chunk_id == b"fmt ": byte_rate = struct.unpack("<I", source.read(offset + 16, 4))[0]
+        if chunk_id == b"data": return min(chunk_size, source.size - offset - 8) / byte_rate if byte_rate else None
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def mp3_duration(source: ByteSource) -> Optional[float]:
+    head, offset = source.head, 0
+    if head[:3] == b"ID3" and len(head) >= 10:
+        offset = 10 + ((head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F))
+    frame = source.read(offset, 4096)
+    sync = next((index for index in range(len(frame) - 3) if frame[index] == 0xFF and frame[index + 1] & 0xE0 == 0xE0), None)
+    if sync is None: return None
+    version, layer = (frame[sync + 1] >> 3) & 3, (frame[sync + 1] >> 1) & 3
+    bitrate_index, sample_rate_index, mono = frame[sync + 2] >> 4, (frame[sync + 2] >> 2) & 3, frame[sync + 3] >> 6 == 3
+    if layer != 1 or version not in MP3_SAMPLE_RATES or sample_rate_index == 3 or bitrate_index in (0, 15): return None
+    sample_rate = MP3_SAMPLE_RATES[version][sample_rate_index]
+    samples_per_frame = 1152 if version == 3 else 576
+    side_info = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    xing = frame[sync + 4 + side_info:sync + 4 + side_info + 12]
+    if xing[:4] in (b"Xing", b"Info") and len(xing) == 12 and xing[7] & 1:
+        return struct.unpack(">I", xing[8:12])[0] * samples_per_frame / sample_rate
+    vbri = frame[sync + 36:sync + 54]
+    if vbri[:4] == b"VBRI" and len(vbri) == 18: return struct.unpack(">I", vbri[14:18])[0] * samples_per_frame / sample_rate
+    bitrate = MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    return (source.size - offset - sync) * 8 / bitrate
+
+
+def _ebml_vint(data: bytes, offset: int, keep_marker: bool) -> tuple[Optional[int], int]:
+    if offset >= len(data) or data[offset] == 0: return None, offset
+    length = 8 - data[offset].bit_length() + 1
+    if offset + length > len(data): return None, offset
+    value = data[offset] if keep_marker else data[offset] & (0xFF >> length)
+    for byte in data[offset + 1:offset + length]: value = value << 8 | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1: value = -1
+    return value, offset + length
+
+
+def _ebml_elements(data: bytes, start: int, end: int):
+    offset = start
+    while offset < end:
+        element_id, offset = _ebml_vint(data, offset, True)
+        size, offset = _ebml_vint(data, offset, False) if element_id is not None else (None, offset)
+        if element_id is None or size is None: return
+        yield element_id, offset, size
+        if size < 0: return
+        offset += size
+
+
+def webm_duration(source: ByteSource) -> Optional[float]:
+    head = source.head
+    if not head.startswith(b"\x1a\x45\xdf\xa3"): return None
+    for element_id, start, size in _ebml_elements(head, 0, len(head)):
+        if element_id != 0x18538067: continue
+        for child_id, child_start, child_size in _ebml_elements(head, start, len(head) if size < 0 else min(len(head), start + size)):
+            if child_id != 0x1549A966: continue
+            timecode_scale, duration = 1_000_000, None
+            for info_id, info_start, info_size in _ebml_elements(head, child_start, min(len(head), child_start + child_size)):
+                value = head[info_start:info_start + info_size]
+                if info_id == 0x2AD7B1: timecode_scale = int.from_bytes(value, "big")
+                if info_id == 0x4489 and info_size in (4, 8): duration = struct.unpack(">f" if info_size == 4 else ">d", value)[0]
+            return duration * timecode_scale / 1_000_000_000 if duration is not None else None
+        return None
+    return None
+
+
+def extract_media_metadata(read_range: RangeReader, size: int, mime_type: str) -> dict:
+    source = ByteSource(read_range, size)
+    metadata = {}
+    try:
+        if mime_type.startswith("image/"):
+            dimensions = png_dimensions(source.head) or gif_dimensions(source.head) or webp_dimensions(source.head) or jpeg_dimensions(source)
+            if dimensions: metadata["width"], metadata["height"] = dimensions
+        elif mime_type.startswith(("video/", "audio/")):
+            duration = mp4_duration(source) or webm_duration(source) or wav_duration(source)
+            if duration is None and mime_type in ("audio/mpeg", "audio/mp3"): duration = mp3_duration(source)
+            if duration: metadata["duration"] = round(duration, 3)
+    except (struct.error, IndexError, ValueError): pass
+    return metadata
+
+
+def read_file_range(file) -> RangeReader:
+    def read(offset: int, length: int) -> bytes:
+        file.seek(offset)
+        return file.read(length)
+    return read
@@ -1,14 +1,29 @@
+import asyncio
+import hashlib
 from uuid import UUID
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
 from fastapi import UploadFile
 from slugify import slugify
+from sqlalchemy import bindparam, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import delete, func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from exceptions import InternalServerError, NotFoundException, BadRequestException
 from schemas.media_schema import MediaMetaData, MediaUpdateSchema
+from services.apps_service import app_exists_cache
+from services.helpers.media_metadata import extract_media_metadata, read_file_range
 from services.s3_service import S3Service
-from models import App, User, Media
+from models import App, User, Media, StorageDeletion, default_time, generate_uuid
+from cache import CacheClient
+from cache.memory import named_cache
+from config import config
 import os
+import secrets
+
+HASH_CHUNK_SIZE = 1024 * 1024
+STORAGE_QUEUE_BATCH_SIZE = 1000
+user_exists_cache = named_cache("user_exists", config.REFERENCE_CACHE_MAX_ENTRIES, config.REFERENCE_CACHE_TTL_SECONDS)
 
 
 class MediaServiceHelper:
@@ -16,11 +31,19 @@ class MediaServiceHelper:
         self.session = session
         self.s3 = s3
 
-    async def _validate_app_and_user(self, app_id: UUID, user_id: UUID) -> None:
+    async def _validate_app(self, app_id: UUID, cache: CacheClient) -> None:
+        key = (await cache.get_version("apps"), str(app_id))
+        if app_exists_cache.get(key): return
         app = await self.session.get(App, str(app_id))
         if not app: raise NotFoundException(detail="App not found")
-        user = await self.session.get(User, str(user_id))
-        if not user: raise NotFoundException(detail="User not found")
+        app_exists_cache.set(key, True)
+
+    async def _validate_app_and_user(self, app_id: UUID, user_id: UUID, cache: CacheClient) -> None:
+        await self._validate_app(app_id, cache)
+        if not user_exists_cache.get(str(user_id)):
+            user = await self.session.get(User, str(user_id))
+            if not user: raise NotFoundException(detail="User not found")
+            user_exists_cache.set(str(user_id), True)
 
     def _process_filename(self, file: UploadFile) -> tuple[str, str]:
         original_filename = file.filename or "unnamed"
@@ -40,19 +63,69 @@ class MediaServiceHelper:
     def _generate_file_key(self, app_id: UUID, slug_name: str, file_extension: str) -> str:
         timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
         final_filename = f"{slug_name}{file_extension}"
-        return f"media/{app_id}/{timestamp}_{final_filename}"
+        return f"media/{app_id}/{timestamp}_{secrets.token_hex(4)}_{final_filename}"
 
     async def _upload_to_s3(self, file: UploadFile, file_key: str, app_id: UUID, user_id: UUID, meta_data: MediaMetaData, slug_name: str, original_filename: str) -> None:
         try:
-            file_contents = await file.read()
             meta = {'name': slug_name, 'app_id': str(app_id), 'original_filename': original_filename,
                     'media_type': meta_data.media_type.value, 'uploaded_by': str(user_id)}
-            await self.s3.upload_file(file_key, file_contents, file.content_type, meta)
+            await self.s3.upload_stream(file_key, file, file.content_type, meta)
         except Exception as e: raise InternalServerError(detail=f"Failed to upload file: {str(e)}") from e
 
-    async def _create_media_record(self, app_id: UUID, user_id: UUID, file: UploadFile, meta_data: MediaMetaData, original_filename: str, file_extension: str, file_key: str, file_path: str, slug_name: str) -> Media:
-        media = Media(name=slug_name, original_filename=original_filename, file_key=file_key, file_path=file_path, file_extension=file_extension.lstrip('.'), file_size=file.size, mime_type=file.content_type or "application/octet-stream",
+    async def _hash_file(self, file: UploadFile) -> str:
+        def digest() -> str:
+            file.file.seek(0)
+            hasher = hashlib.sha256()
+            for chunk in iter(lambda: file.file.read(HASH_CHUNK_SIZE), b""): hasher.update(chunk)
+            return hasher.hexdigest()
+        sha256 = await asyncio.to_thread(digest)
+        await file.seek(0)
+        return sha256
+
+    async def _lock_app_media(self, app_id: UUID) -> None:
+        await self.session.exec(select(func.pg_advisory_xact_lock(func.hashtext(f"media:{app_id}"))))
+
+    async def _queue_storage_deletions(self, file_keys: List[str]) -> None:
+        now = default_time()
+        next_attempt_at = now + timedelta(seconds=config.STORAGE_DELETE_RETRY_SECONDS)
+        for index in range(0, len(file_keys), STORAGE_QUEUE_BATCH_SIZE):
+            rows = [{"id": generate_uuid(), "file_key": file_key, "attempts": 0, "next_attempt_at": next_attempt_at, "created_at": now, "updated_at": now} for file_key in file_keys[index:index + STORAGE_QUEUE_BATCH_SIZE]]
+            await self.session.exec(insert(StorageDeletion).values(rows).on_conflict_do_nothing(index_elements=["file_key"]))
+
+    async def _delete_queued_files(self, file_keys: List[str]) -> dict[str, str]:
+        failed = await self.s3.delete_files(file_keys)
+        await self._settle_storage_deletions(file_keys, failed)
+        return failed
+
+    async def _settle_storage_deletions(self, file_keys: List[str], failed: dict[str, str]) -> None:
+        deleted = [file_key for file_key in file_keys if file_key not in failed]
+        for index in range(0, len(deleted), STORAGE_QUEUE_BATCH_SIZE):
+            await self.session.exec(delete(StorageDeletion).where(StorageDeletion.file_key.in_(deleted[index:index + STORAGE_QUEUE_BATCH_SIZE])))
+        if failed:
+            backoff = timedelta(seconds=config.STORAGE_DELETE_RETRY_SECONDS) * func.power(2, func.least(StorageDeletion.attempts, 10))
+            statement = update(StorageDeletion.__table__).where(StorageDeletion.file_key == bindparam("key")).values(attempts=StorageDeletion.attempts + 1, last_error=bindparam("error"), next_attempt_at=func.now() + backoff)
+            await self.session.exec(statement, params=[{"key": file_key, "error": error[:1024]} for file_key, error in failed.items()])
+        await self.session.commit()
+
+    async def _find_stored_files(self, app_id: UUID, hashes: Iterable[str]) -> dict[str, tuple[str, str]]:
+        hashes = list(hashes)
+        if not hashes: return {}
+        result = await self.session.exec(select(Media.sha256, Media.file_key, Media.file_path).distinct(Media.sha256).where(Media.app_id == str(app_id), Media.sha256.in_(hashes)))
+        return {sha256: (file_key, file_path) for sha256, file_key, file_path in result.all()}
+
+    async def _extract_metadata(self, file: UploadFile) -> dict:
+        metadata = await asyncio.to_thread(extract_media_metadata, read_file_range(file.file), file.size or 0, file.content_type or "")
+        await file.seek(0)
+        return metadata
+
+    def _media_values(self, app_id: UUID, user_id: UUID, file: UploadFile, meta_data: MediaMetaData, original_filename: str, file_extension: str, file_key: str, file_path: str, slug_name: str, metadata: Optional[dict] = None) -> dict:
+        values = dict(width=None, height=None, duration=None, sha256=None, name=slug_name, original_filename=original_filename, file_key=file_key, file_path=file_path, file_extension=file_extension.lstrip('.'), file_size=file.size, mime_type=file.content_type or "application/octet-stream",
                       media_type=meta_data.media_type, is_public=meta_data.is_public, alt_text=meta_data.alt_text, caption=meta_data.caption, meta=meta_data.meta, app_id=str(app_id), uploaded_by_id=str(user_id))
+        values.update(metadata or {})
+        return values
+
+    async def _create_media_record(self, app_id: UUID, user_id: UUID, file: UploadFile, meta_data: MediaMetaData, original_filename: str, file_extension: str, file_key: str, file_path: str, slug_name: str, metadata: Optional[dict] = None) -> Media:
+        media = Media(**self._media_values(app_id, user_id, file, meta_data, original_filename, file_extension, file_key, file_path, slug_name, metadata))
         self.session.add(media)
         await self.session.commit()
         await self.session.refresh(media)
@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import Optional, Sequence
+from sqlalchemy import tuple_
+from exceptions import BadRequestException
+from utils import decode_cursor, encode_cursor
+
+
+def paginate_by_created_at(statement, created_at, id, limit: int, cursor: Optional[str] = None):
+    if cursor:
+        last_created_at, last_id = decode_cursor(cursor, 2)
+        if not isinstance(last_id, str): raise BadRequestException(detail="Invalid cursor")
+        try: last_created_at = datetime.fromisoformat(last_created_at)
+        except (TypeError, ValueError): raise BadRequestException(detail="Invalid cursor")
+        statement = statement.where(tuple_(created_at, id) < tuple_(last_created_at, last_id))
+    return statement.order_by(created_at.desc(), id.desc()).limit(limit + 1)
+
+
+def next_page_cursor(rows: Sequence, limit: int) -> Optional[str]:
+    if len(rows) <= limit: return None
+    return encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id)
@@ -1,21 +1,43 @@
+import asyncio
+import base64
+import binascii
+import math
+import os
+import tempfile
+from datetime import datetime, timedelta
 from uuid import UUID
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Sequence
 from fastapi import UploadFile
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import select, and_, delete
-from exceptions import InternalServerError, NotFoundException, BadRequestException
-from schemas.media_schema import MediaMetaData, MediaUpdateSchema
+from sqlalchemy import Text, any_, literal, update
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlmodel import select, and_, delete, func
+from cache import CacheClient
+from database import async_session
+from exceptions import ForbiddenException, InternalServerError, NotFoundException, BadRequestException, UnprocessableEntityException
+from schemas.media_schema import MediaBatchUploadResultSchema, MediaBulkDeleteOutSchema, MediaBulkDeleteSchema, MediaMetaData, MediaResponse, MediaUpdateSchema, MediaUploadFinalizeSchema, MediaUploadInitiateOutSchema, MediaUploadInitiateSchema, MediaUploadPartUrlSchema
+from services.helpers.image_variants import VARIANT_FORMATS, VariantSourceTooLargeError, get_variant_pool, render_variant
 from services.helpers.media_service_helper import MediaServiceHelper
+from services.helpers.pagination import next_page_cursor, paginate_by_created_at
 from services.s3_service import S3Service
-from models import Media, MediaTypeEnum
+from models import ImageFormatEnum, Media, MediaTypeEnum, MediaUpload, MediaVariant, StorageDeletion, default_time, generate_uuid
+from utils import get_media_type
 from config import config
 
+MEDIA_FIELD_COLUMNS = {
+    "id": (Media.id,), "name": (Media.name,), "media_type": (Media.media_type,), "url": (Media.is_public, Media.file_path),
+    "alt_text": (Media.alt_text,), "caption": (Media.caption,), "is_public": (Media.is_public,),
+    "width": (Media.width,), "height": (Media.height,), "duration": (Media.duration,)
+}
+MEDIA_FIELDS = tuple(MEDIA_FIELD_COLUMNS)
+MEDIA_STREAM_BATCH_SIZE = 1000
+FOREIGN_KEY_VIOLATION = "23503"
+
 
 class MediaService(MediaServiceHelper):
-    def __init__(self, session: AsyncSession):
-        self.session = session
-        self.s3 = S3Service()
-        super().__init__(session, self.s3)
+    def __init__(self, session: AsyncSession, s3: S3Service):
+        super().__init__(session, s3)
 
     async def get_media(self, app_id: UUID, media_id: UUID) -> Media:
         try:
@@ -27,32 +49,231 @@ class MediaService(MediaServiceHelper):
             if isinstance(e, NotFoundException): raise
             raise NotFoundException(detail="Media not found") from e
 
-    async def list_app_media(self, app_id: UUID, media_type: Optional[MediaTypeEnum] = None, limit: int = 100, offset: int = 0) -> List[Media]:
+    async def get_media_fingerprint(self, app_id: UUID, media_id: Optional[UUID] = None) -> tuple:
+        revision = func.concat(Media.id, ":", Media.updated_at)
+        statement = select(func.count(), func.md5(func.string_agg(revision, aggregate_order_by(literal(","), Media.id)))).where(Media.app_id == str(app_id))
+        if media_id: statement = statement.where(Media.id == str(media_id))
+        count, digest = (await self.session.exec(statement)).one()
+        if media_id and not count: raise NotFoundException(detail="Media not found")
+        return count, digest
+
+    @staticmethod
+    def _media_columns(fields: Sequence[str]) -> list:
+        columns = {column.key: column for field in ("id", *fields) for column in MEDIA_FIELD_COLUMNS[field]}
+        columns.setdefault(Media.created_at.key, Media.created_at)
+        return list(columns.values())
+
+    @staticmethod
+    def _media_item(row, fields: Sequence[str]) -> dict:
+        return {field: MediaService._media_url(row) if field == "url" else getattr(row, field) for field in fields}
+
+    async def get_media_item(self, app_id: UUID, media_id: UUID, fields: Sequence[str] = MEDIA_FIELDS) -> dict:
+        statement = select(*self._media_columns(fields)).where(and_(Media.id == str(media_id), Media.app_id == str(app_id)))
+        row = (await self.session.exec(statement)).first()
+        if row is None: raise NotFoundException(detail="Media not found")
+        return self._media_item(row, fields)
+
+    async def list_app_media(self, app_id: UUID, media_type: Optional[MediaTypeEnum] = None, limit: int = 100, cursor: Optional[str] = None, fields: Sequence[str] = MEDIA_FIELDS) -> tuple[List[dict], Optional[str]]:
         try:
-            statement = select(Media).where(Media.app_id == str(app_id))
+            statement = select(*self._media_columns(fields)).where(Media.app_id == str(app_id))
             if media_type: statement = statement.where(Media.media_type == media_type)
-            statement = statement.offset(offset).limit(limit).order_by(Media.created_at.desc())
-            result = await self.session.exec(statement)
-            return result.all()
+            result = await self.session.exec(paginate_by_created_at(statement, Media.created_at, Media.id, limit, cursor))
+            rows = result.all()
+            return [self._media_item(row, fields) for row in rows[:limit]], next_page_cursor(rows, limit)
         except Exception as e:
+            if isinstance(e, BadRequestException): raise
             raise InternalServerError(detail="Failed to fetch media list") from e
 
-    async def upload_media(self, app_id: UUID, user_id: UUID, file: UploadFile, meta_data: MediaMetaData) -> Media:
+    async def stream_app_media(self, app_id: UUID, cache: CacheClient, media_type: Optional[MediaTypeEnum] = None, updated_since: Optional[datetime] = None, fields: Sequence[str] = MEDIA_FIELDS) -> AsyncIterator[dict]:
+        await self._validate_app(app_id, cache)
+        statement = select(*self._media_columns(fields)).where(Media.app_id == str(app_id))
+        if media_type: statement = statement.where(Media.media_type == media_type)
+        if updated_since: statement = statement.where(Media.updated_at >= updated_since)
+        statement = statement.order_by(Media.created_at, Media.id).execution_options(yield_per=MEDIA_STREAM_BATCH_SIZE)
+
+        async def rows():
+            async with async_session() as stream_session:
+                result = await stream_session.stream(statement)
+                async for row in result: yield self._media_item(row, fields)
+        return rows()
+
+    async def upload_media(self, app_id: UUID, user_id: UUID, file: UploadFile, meta_data: MediaMetaData, cache: CacheClient) -> Media:
         try:
-            await self._validate_app_and_user(app_id, user_id)
+            await self._validate_app_and_user(app_id, user_id, cache)
             original_filename, file_extension = self._process_filename(file)
             self._validate_file(file, file_extension)
             slug_name = self._generate_slug_name(meta_data.name, original_filename)
-            file_key = self._generate_file_key(app_id, slug_name, file_extension)
-            file_path = f"{config.AWS_DIST_URL}/{file_key}"
-            await self._upload_to_s3(file, file_key, app_id, user_id, meta_data, slug_name, original_filename)
-            media = await self._create_media_record(app_id, user_id, file, meta_data, original_filename, file_extension, file_key, file_path, slug_name)
+            metadata = {**await self._extract_metadata(file), "sha256": await self._hash_file(file)}
+            await self._lock_app_media(app_id)
+            stored = (await self._find_stored_files(app_id, [metadata["sha256"]])).get(metadata["sha256"])
+            if stored: file_key, file_path = stored
+            else:
+                await self.session.commit()
+                file_key = self._generate_file_key(app_id, slug_name, file_extension)
+                file_path = f"{config.AWS_DIST_URL}/{file_key}"
+                await self._upload_to_s3(file, file_key, app_id, user_id, meta_data, slug_name, original_filename)
+            media = await self._create_media_record(app_id, user_id, file, meta_data, original_filename, file_extension, file_key, file_path, slug_name, metadata)
             return media
         except Exception as e:
             await self.session.rollback()
             if isinstance(e, (NotFoundException, BadRequestException, InternalServerError)): raise
             raise InternalServerError(detail="Failed to upload media") from e
 
+    async def upload_media_batch(self, app_id: UUID, user_id: UUID, uploads: List[tuple[UploadFile, MediaMetaData]], cache: CacheClient) -> List[MediaBatchUploadResultSchema]:
+        await self._validate_app_and_user(app_id, user_id, cache)
+        semaphore = asyncio.Semaphore(config.MEDIA_BATCH_UPLOAD_CONCURRENCY)
+        results = [MediaBatchUploadResultSchema(filename=file.filename or "unnamed") for file, _ in uploads]
+        prepared: dict[int, tuple[str, str, str, dict]] = {}
+        rows: dict[str, tuple[int, dict]] = {}
+        uploaded_keys: set[str] = set()
+
+        async def prepare(index: int, file: UploadFile, meta_data: MediaMetaData):
+            try:
+                original_filename, file_extension = self._process_filename(file)
+                self._validate_file(file, file_extension)
+                slug_name = self._generate_slug_name(meta_data.name, original_filename)
+                async with semaphore: metadata = {**await self._extract_metadata(file), "sha256": await self._hash_file(file)}
+                prepared[index] = (original_filename, file_extension, slug_name, metadata)
+            except Exception as e: results[index].error = getattr(e, "detail", None) or "Failed to upload media"
+
+        async def upload(index: int, file: UploadFile, meta_data: MediaMetaData):
+            original_filename, file_extension, slug_name, metadata = prepared[index]
+            try:
+                file_key = self._generate_file_key(app_id, slug_name, file_extension)
+                async with semaphore: await self._upload_to_s3(file, file_key, app_id, user_id, meta_data, slug_name, original_filename)
+                uploaded_keys.add(file_key)
+                stored[metadata["sha256"]] = (file_key, f"{config.AWS_DIST_URL}/{file_key}")
+            except Exception as e: results[index].error = getattr(e, "detail", None) or "Failed to upload media"
+
+        await asyncio.gather(*(prepare(index, file, meta_data) for index, (file, meta_data) in enumerate(uploads)))
+        stored = await self._find_stored_files(app_id, {metadata["sha256"] for *_, metadata in prepared.values()})
+        await self.session.commit()
+        leaders: dict[str, int] = {}
+        for index in sorted(prepared):
+            if prepared[index][3]["sha256"] not in stored: leaders.setdefault(prepared[index][3]["sha256"], index)
+        await asyncio.gather(*(upload(index, *uploads[index]) for index in leaders.values()))
+        for index, (original_filename, file_extension, slug_name, metadata) in prepared.items():
+            if metadata["sha256"] not in stored:
+                results[index].error = results[leaders[metadata["sha256"]]].error
+                continue
+            file, meta_data = uploads[index]
+            file_key, file_path = stored[metadata["sha256"]]
+            media_id = generate_uuid()
+            rows[media_id] = (index, {**self._media_values(app_id, user_id, file, meta_data, original_filename, file_extension, file_key, file_path, slug_name, metadata), "id": media_id})
+        inserted: set[str] = set()
+        if rows:
+            now = default_time()
+            try:
+                await self._lock_app_media(app_id)
+                reused_keys = {row["file_key"] for _, row in rows.values()} - uploaded_keys
+                result = await self.session.exec(select(Media.file_key).distinct().where(Media.app_id == str(app_id), Media.file_key.in_(reused_keys)))
+                missing_keys = reused_keys - set(result.all())
+                values = [{**row, "created_at": now, "updated_at": now} for _, row in rows.values() if row["file_key"] not in missing_keys]
+                if values:
+                    result = await self.session.exec(insert(Media).values(values).on_conflict_do_nothing().returning(Media.id))
+                    inserted = set(result.scalars().all())
+                await self.session.commit()
+            except DBAPIError:
+                await self.session.rollback()
+        for media_id, (index, row) in rows.items():
+            if media_id not in inserted:
+                results[index].error = "Failed to save media"
+                continue
+            media = Media(**row)
+            results[index].status, results[index].media = "created", MediaResponse.from_model(media, await self.get_media_url(media))
+        orphaned = uploaded_keys - {row["file_key"] for media_id, (_, row) in rows.items() if media_id in inserted}
+        await self.purge_storage_objects(sorted(orphaned))
+        return results
+
+    async def initiate_upload(self, app_id: UUID, user_id: UUID, data: MediaUploadInitiateSchema, cache: CacheClient) -> MediaUploadInitiateOutSchema:
+        await self._validate_app_and_user(app_id, user_id, cache)
+        original_filename, file_extension = data.filename, os.path.splitext(data.filename)[1].lower()
+        if not file_extension: raise BadRequestException(detail="File must have an extension")
+        if data.checksum_sha256:
+            try: digest = base64.b64decode(data.checksum_sha256, validate=True)
+            except binascii.Error: digest = b""
+            if len(digest) != 32: raise BadRequestException(detail="checksum_sha256 must be a base64 encoded SHA-256 digest")
+        part_size = config.S3_MULTIPART_PART_SIZE
+        part_count = math.ceil(data.size / part_size)
+        if part_count > 10000: raise BadRequestException(detail="File is too large to upload")
+        if part_count > 1 and data.checksum_sha256: raise BadRequestException(detail="checksum_sha256 applies to single PUT uploads, multipart parts send x-amz-checksum-sha256")
+        slug_name = self._generate_slug_name(data.name, original_filename)
+        file_key = self._generate_file_key(app_id, slug_name, file_extension)
+        expires_in = config.MEDIA_UPLOAD_EXPIRY_SECONDS
+        multipart_upload_id = await self.s3.create_multipart_upload(file_key, data.content_type) if part_count > 1 else None
+        upload = MediaUpload(file_key=file_key, name=slug_name, original_filename=original_filename, file_extension=file_extension.lstrip('.'), file_size=data.size, mime_type=data.content_type, media_type=get_media_type(data.content_type),
+                             checksum_sha256=data.checksum_sha256, multipart_upload_id=multipart_upload_id, alt_text=data.alt_text, caption=data.caption, meta=data.meta, is_public=data.is_public,
+                             expires_at=default_time() + timedelta(seconds=expires_in), app_id=str(app_id), uploaded_by_id=str(user_id))
+        self.session.add(upload)
+        await self.session.commit()
+        if multipart_upload_id:
+            parts = [MediaUploadPartUrlSchema(part_number=number, url=self.s3.generate_presigned_part_url(file_key, multipart_upload_id, number, expires_in)) for number in range(1, part_count + 1)]
+            return MediaUploadInitiateOutSchema(id=upload.id, file_key=file_key, method="multipart", part_size=part_size, parts=parts, expires_at=upload.expires_at)
+        headers = {"Content-Type": data.content_type}
+        if data.checksum_sha256: headers["x-amz-checksum-sha256"] = data.checksum_sha256
+        url = self.s3.generate_presigned_put_url(file_key, data.content_type, expires_in, data.checksum_sha256)
+        return MediaUploadInitiateOutSchema(id=upload.id, file_key=file_key, method="PUT", url=url, headers=headers, expires_at=upload.expires_at)
+
+    async def finalize_upload(self, app_id: UUID, upload_id: UUID, user_id: UUID, data: MediaUploadFinalizeSchema) -> Media:
+        result = await self.session.exec(select(MediaUpload).where(MediaUpload.id == str(upload_id), MediaUpload.app_id == str(app_id)).with_for_update())
+        upload = result.one_or_none()
+        if not upload: raise NotFoundException(detail="Upload not found")
+        if upload.uploaded_by_id != str(user_id): raise ForbiddenException(detail="Upload was reserved by another user")
+        if upload.expires_at <= default_time(): raise BadRequestException(detail="Upload reservation has expired")
+        head = await self.s3.head_object(upload.file_key)
+        if head is None and upload.multipart_upload_id:
+            if not data.parts: raise BadRequestException(detail="Multipart uploads must be finalized with their uploaded parts")
+            await self.s3.complete_multipart_upload(upload.file_key, upload.multipart_upload_id, [{'PartNumber': part.part_number, 'ETag': part.etag, 'ChecksumSHA256': part.checksum_sha256} for part in data.parts])
+            head = await self.s3.head_object(upload.file_key)
+        if head is None: raise BadRequestException(detail="Uploaded file not found in storage")
+        if head.get('ContentLength') != upload.file_size: raise BadRequestException(detail="Uploaded file size does not match the reservation")
+        if head.get('ContentType') != upload.mime_type: raise BadRequestException(detail="Uploaded file content type does not match the reservation")
+        if upload.checksum_sha256 and head.get('ChecksumSHA256') != upload.checksum_sha256: raise BadRequestException(detail="Uploaded file checksum does not match the reservation")
+        sha256 = base64.b64decode(upload.checksum_sha256).hex() if upload.checksum_sha256 else None
+        metadata = await self.s3.extract_metadata(upload.file_key, upload.file_size, upload.mime_type)
+        await self._lock_app_media(app_id)
+        stored = (await self._find_stored_files(app_id, [sha256])).get(sha256) if sha256 else None
+        file_key, file_path = stored or (upload.file_key, f"{config.AWS_DIST_URL}/{upload.file_key}")
+        media = Media(**metadata, sha256=sha256, name=upload.name, original_filename=upload.original_filename, file_key=file_key, file_path=file_path, file_extension=upload.file_extension, file_size=upload.file_size, mime_type=upload.mime_type,
+                      media_type=upload.media_type, is_public=upload.is_public, alt_text=upload.alt_text, caption=upload.caption, meta=upload.meta, app_id=upload.app_id, uploaded_by_id=upload.uploaded_by_id)
+        self.session.add(media)
+        await self.session.delete(upload)
+        duplicate_keys = [upload.file_key] if stored else []
+        if duplicate_keys: await self._queue_storage_deletions(duplicate_keys)
+        await self.session.commit()
+        await self.session.refresh(media)
+        if duplicate_keys: await self._delete_queued_files(duplicate_keys)
+        return media
+
+    async def get_variant_url(self, app_id: UUID, media_id: UUID, width: int, height: int, image_format: ImageFormatEnum, cache: CacheClient) -> str:
+        media = await self.get_media(app_id, media_id)
+        if media.media_type != MediaTypeEnum.image: raise BadRequestException(detail="Variants are only available for images")
+        file_key = f"media/{app_id}/variants/{media_id}/{width}x{height}.{image_format.value}"
+
+        async def render() -> str:
+            result = await self.session.exec(select(MediaVariant.id).where(MediaVariant.file_key == file_key))
+            if result.first() is not None: return file_key
+            if media.file_size > config.MEDIA_VARIANT_MAX_SOURCE_BYTES: raise UnprocessableEntityException(detail="Image is too large to render variants")
+            with tempfile.NamedTemporaryFile(prefix="variant-") as original:
+                await self.s3.download_to_file(media.file_key, original.name, config.MEDIA_VARIANT_MAX_SOURCE_BYTES)
+                try: data = await asyncio.get_running_loop().run_in_executor(get_variant_pool(), render_variant, original.name, width, height, image_format, config.MEDIA_VARIANT_QUALITY, config.MEDIA_VARIANT_MAX_SOURCE_PIXELS)
+                except VariantSourceTooLargeError as e: raise UnprocessableEntityException(detail="Image is too large to render variants") from e
+                except Exception as e: raise UnprocessableEntityException(detail="Unable to render image variant") from e
+            await self.s3.upload_file(file_key, data, VARIANT_FORMATS[image_format][1])
+            now = default_time()
+            try:
+                await self.session.exec(insert(MediaVariant).values(id=generate_uuid(), width=width, height=height, format=image_format, file_key=file_key, file_size=len(data), media_id=str(media_id), created_at=now, updated_at=now).on_conflict_do_nothing())
+                await self.session.commit()
+            except IntegrityError as e:
+                await self.session.rollback()
+                await self.s3.delete_file(file_key)
+                if getattr(e.orig, "sqlstate", None) == FOREIGN_KEY_VIOLATION: raise NotFoundException(detail="Media not found")
+                raise InternalServerError(detail="Failed to save image variant") from e
+            return file_key
+
+        await cache.get_or_load(f"media:variant:{file_key}", render)
+        return f"{config.AWS_DIST_URL}/{file_key}" if media.is_public else self.s3.generate_presigned_url(file_key)
+
     async def update_media(self, app_id: UUID, media_id: UUID, meta_data: MediaUpdateSchema) -> Media:
         try:
             media = await self.get_media(app_id, media_id)
@@ -67,19 +288,88 @@ class MediaService(MediaServiceHelper):
             raise InternalServerError(detail="Failed to update media") from e
 
     async def delete_media(self, app_id: UUID, media_id: UUID) -> bool:
+        result = await self._delete_media_where(app_id, Media.id == str(media_id))
+        if not result.deleted: raise NotFoundException(detail="Media not found")
+        return True
+
+    async def delete_media_bulk(self, app_id: UUID, delete_data: MediaBulkDeleteSchema) -> MediaBulkDeleteOutSchema:
+        conditions = []
+        if delete_data.ids is not None:
+            if len(delete_data.ids) > config.MEDIA_BULK_DELETE_MAX_IDS: raise BadRequestException(detail=f"At most {config.MEDIA_BULK_DELETE_MAX_IDS} media ids can be deleted at once")
+            conditions.append(Media.id.in_([str(media_id) for media_id in delete_data.ids]))
+        if delete_data.media_type: conditions.append(Media.media_type == delete_data.media_type)
+        if delete_data.created_before: conditions.append(Media.created_at < delete_data.created_before)
+        if not conditions: raise BadRequestException(detail="Media ids or a filter are required")
+        return await self._delete_media_where(app_id, *conditions)
+
+    async def _delete_media_where(self, app_id: UUID, *conditions) -> MediaBulkDeleteOutSchema:
         try:
-            media = await self.get_media(app_id, media_id)
-            try: await self.s3.delete_file(media.file_key)
-            except Exception as e: raise InternalServerError(detail=f"Failed to delete file from storage: {str(e)}") from e
-            statement = delete(Media).where(and_(Media.id == str(media_id), Media.app_id == str(app_id)))
-            await self.session.exec(statement)
+            await self._lock_app_media(app_id)
+            media_ids = select(Media.id).where(Media.app_id == str(app_id), *conditions)
+            variants = await self.session.exec(delete(MediaVariant).where(MediaVariant.media_id.in_(media_ids)).returning(MediaVariant.file_key))
+            file_keys = set(variants.scalars().all())
+            deleted = (await self.session.exec(delete(Media).where(Media.app_id == str(app_id), *conditions).returning(Media.file_key))).scalars().all()
+            if deleted:
+                references = await self.session.exec(select(Media.file_key).distinct().where(Media.app_id == str(app_id), Media.file_key == any_(literal(list(set(deleted)), ARRAY(Text)))))
+                file_keys |= set(deleted) - set(references.all())
+            file_keys = sorted(file_keys)
+            if file_keys: await self._queue_storage_deletions(file_keys)
             await self.session.commit()
-            return True
         except Exception as e:
             await self.session.rollback()
-            if isinstance(e, (NotFoundException, InternalServerError)): raise
             raise InternalServerError(detail="Failed to delete media") from e
+        failed = await self._delete_queued_files(file_keys) if file_keys else {}
+        return MediaBulkDeleteOutSchema(deleted=len(deleted), storage_pending=len(failed))
+
+    async def record_media_hash(self, app_id: str, media_id: str, file_key: str, sha256: str) -> bool:
+        await self._lock_app_media(app_id)
+        stored = (await self._find_stored_files(app_id, [sha256])).get(sha256)
+        values = {"sha256": sha256, **({"file_key": stored[0], "file_path": stored[1]} if stored and stored[0] != file_key else {})}
+        updated = await self.session.exec(update(Media).where(Media.id == media_id, Media.file_key == file_key, Media.sha256 == None).values(**values))
+        duplicate_keys = []
+        if updated.rowcount and "file_key" in values:
+            references = await self.session.exec(select(Media.id).where(Media.app_id == app_id, Media.file_key == file_key).limit(1))
+            if references.first() is None: duplicate_keys = [file_key]
+        if duplicate_keys: await self._queue_storage_deletions(duplicate_keys)
+        await self.session.commit()
+        if duplicate_keys: await self._delete_queued_files(duplicate_keys)
+        return bool(updated.rowcount) and "file_key" in values
+
+    async def retry_storage_deletions(self, limit: int) -> tuple[int, int]:
+        result = await self.session.exec(select(StorageDeletion.file_key).where(StorageDeletion.next_attempt_at <= default_time()).order_by(StorageDeletion.next_attempt_at).limit(limit).with_for_update(skip_locked=True))
+        file_keys = list(result.all())
+        if not file_keys:
+            await self.session.commit()
+            return 0, 0
+        failed = await self._delete_queued_files(file_keys)
+        return len(file_keys) - len(failed), len(failed)
+
+    async def expire_uploads(self, limit: int) -> tuple[int, int]:
+        result = await self.session.exec(select(MediaUpload).where(MediaUpload.expires_at <= default_time()).order_by(MediaUpload.expires_at).limit(limit).with_for_update(skip_locked=True))
+        uploads = result.all()
+        expired, postponed = [], []
+        for upload in uploads:
+            try:
+                if upload.multipart_upload_id: await self.s3.abort_multipart_upload(upload.file_key, upload.multipart_upload_id)
+                expired.append(upload)
+            except Exception: postponed.append(upload.id)
+        if postponed: await self.session.exec(update(MediaUpload).where(MediaUpload.id.in_(postponed)).values(expires_at=default_time() + timedelta(seconds=config.STORAGE_DELETE_RETRY_SECONDS)))
+        if expired:
+            await self.session.exec(delete(MediaUpload).where(MediaUpload.id.in_([upload.id for upload in expired])))
+            await self._queue_storage_deletions([upload.file_key for upload in expired])
+        await self.session.commit()
+        if expired: await self._delete_queued_files([upload.file_key for upload in expired])
+        return len(expired), len(postponed)
+
+    async def purge_storage_objects(self, file_keys: List[str]) -> int:
+        if not file_keys: return 0
+        await self._queue_storage_deletions(file_keys)
+        await self.session.commit()
+        return len(await self._delete_queued_files(file_keys))
+
+    @staticmethod
+    def _media_url(media) -> Optional[str]:
+        return media.file_path if media.is_public else None
 
     async def get_media_url(self, media: Media) -> Optional[str]:
-        if not media.is_public: return None
-        return media.file_path
+        return self._media_url(media)
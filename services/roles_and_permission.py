@@ -1,12 +1,19 @@
 from sqlmodel import select
 from models import Role, RoleEnum
 from sqlmodel.ext.asyncio.session import AsyncSession
+from cache.memory import named_cache
+from config import config
+
+role_cache = named_cache("roles", len(RoleEnum), config.REFERENCE_CACHE_TTL_SECONDS)
 
 
 class RolesAndPermission:
     async def get_role_by_name(self, role_name: RoleEnum, session: AsyncSession):
+        role = role_cache.get(role_name)
+        if role is not None: return role
         result = await session.exec(select(Role).where(Role.name == role_name))
         role = result.one_or_none()
+        if role is not None: role_cache.set(role_name, Role.model_validate(role))
         return role
 
     async def get_role_by_id(self, role_id: str, session: AsyncSession):
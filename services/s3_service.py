@@ -1,32 +1,173 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from io import BytesIO
-from typing import Optional
+from typing import Any, AsyncIterator, Callable, List, Optional
 from config import config
-from botocore.exceptions import ClientError
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 from fastapi import UploadFile
-from exceptions import InternalServerError
+from exceptions import BadRequestException, InternalServerError, UnprocessableEntityException
+from services.helpers.media_metadata import extract_media_metadata
 
 import boto3
 
+DELETE_BATCH_SIZE = 1000
+LIST_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1024 * 1024
+
 
 class S3Service:
     def __init__(self):
-        self.s3 = boto3.client('s3', aws_access_key_id=config.AWS_ACCESS_KEY, aws_secret_access_key=config.AWS_SECRET_KEY, region_name=config.AWS_REGION)
+        client_config = Config(max_pool_connections=config.S3_MAX_POOL_CONNECTIONS, retries={"max_attempts": config.S3_MAX_ATTEMPTS, "mode": "adaptive"})
+        self.s3 = boto3.client('s3', aws_access_key_id=config.AWS_ACCESS_KEY, aws_secret_access_key=config.AWS_SECRET_KEY, region_name=config.AWS_REGION, endpoint_url=config.S3_ENDPOINT_URL, config=client_config)
         self.bucket_name = config.S3_BUCKET_NAME
+        self.executor = ThreadPoolExecutor(max_workers=config.S3_MAX_POOL_CONNECTIONS, thread_name_prefix="s3")
+
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args, **kwargs))
 
     async def upload_file(self, file_key: str, file_contents: bytes, content_type: str, metadata: Optional[dict] = None) -> bool:
         try:
             extra_args = {'Metadata': metadata or {}, 'ContentType': content_type}
-            self.s3.upload_fileobj(BytesIO(file_contents), self.bucket_name, file_key, ExtraArgs=extra_args)
+            await self._run(self.s3.upload_fileobj, BytesIO(file_contents), self.bucket_name, file_key, ExtraArgs=extra_args)
             return True
         except ClientError as e: raise InternalServerError(detail=f"S3 upload failed: {str(e)}")
 
+    async def upload_stream(self, file_key: str, stream: UploadFile, content_type: str, metadata: Optional[dict] = None) -> int:
+        part_size, semaphore = config.S3_MULTIPART_PART_SIZE, asyncio.Semaphore(config.S3_MULTIPART_CONCURRENCY)
+        object_args = {'Bucket': self.bucket_name, 'Key': file_key}
+        await semaphore.acquire()
+        chunk = await stream.read(part_size)
+        try:
+            if len(chunk) < part_size:
+                await self._run(self.s3.put_object, **object_args, Body=chunk, ContentType=content_type, Metadata=metadata or {})
+                return len(chunk)
+        except ClientError as e: raise InternalServerError(detail=f"S3 upload failed: {str(e)}")
+        finally: semaphore.release()
+        await semaphore.acquire()
+        upload_id = (await self._run(self.s3.create_multipart_upload, **object_args, ContentType=content_type, Metadata=metadata or {}))["UploadId"]
+        parts, tasks, errors, total = [], [], [], 0
+
+        async def upload_part(part_number: int, body: bytes):
+            try:
+                result = await self._run(self.s3.upload_part, **object_args, UploadId=upload_id, PartNumber=part_number, Body=body)
+                parts.append({'PartNumber': part_number, 'ETag': result['ETag']})
+            except Exception as e: errors.append(e)
+            finally: semaphore.release()
+
+        async def abort():
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._run(self.s3.abort_multipart_upload, **object_args, UploadId=upload_id)
+
+        try:
+            while chunk:
+                total += len(chunk)
+                tasks.append(asyncio.create_task(upload_part(len(tasks) + 1, chunk)))
+                await semaphore.acquire()
+                if errors: raise errors[0]
+                chunk = await stream.read(part_size)
+            semaphore.release()
+            await asyncio.gather(*tasks)
+            if errors: raise errors[0]
+            parts.sort(key=lambda part: part['PartNumber'])
+            await self._run(self.s3.complete_multipart_upload, **object_args, UploadId=upload_id, MultipartUpload={'Parts': parts})
+            return total
+        except BaseException as e:
+            await asyncio.shield(abort())
+            if isinstance(e, ClientError): raise InternalServerError(detail=f"S3 upload failed: {str(e)}")
+            raise
+
     async def delete_file(self, file_key: str) -> bool:
         try:
-            self.s3.delete_object(Bucket=self.bucket_name, Key=file_key)
+            await self._run(self.s3.delete_object, Bucket=self.bucket_name, Key=file_key)
             return True
         except ClientError as e:
             raise InternalServerError(detail=f"S3 delete failed: {str(e)}")
 
+    async def delete_files(self, file_keys: List[str]) -> dict[str, str]:
+        semaphore, failed = asyncio.Semaphore(config.STORAGE_DELETE_CONCURRENCY), {}
+
+        async def delete_batch(batch: List[str]):
+            async with semaphore:
+                try: result = await self._run(self.s3.delete_objects, Bucket=self.bucket_name, Delete={'Objects': [{'Key': file_key} for file_key in batch], 'Quiet': True})
+                except (BotoCoreError, ClientError) as e:
+                    failed.update(dict.fromkeys(batch, str(e)))
+                    return
+            failed.update({error['Key']: error.get('Message') or error.get('Code', 'Unknown error') for error in result.get('Errors', [])})
+
+        await asyncio.gather(*(delete_batch(file_keys[index:index + DELETE_BATCH_SIZE]) for index in range(0, len(file_keys), DELETE_BATCH_SIZE)))
+        return failed
+
+    async def iter_objects(self, prefix: str, start_after: str = "") -> AsyncIterator[dict]:
+        args = {'Bucket': self.bucket_name, 'Prefix': prefix, 'MaxKeys': LIST_PAGE_SIZE}
+        if start_after: args['StartAfter'] = start_after
+        while True:
+            try: page = await self._run(self.s3.list_objects_v2, **args)
+            except ClientError as e: raise InternalServerError(detail=f"S3 list failed: {str(e)}")
+            for item in page.get('Contents', []): yield item
+            if not page.get('IsTruncated'): return
+            args['ContinuationToken'] = page['NextContinuationToken']
+
+    async def head_object(self, file_key: str) -> Optional[dict]:
+        try: return await self._run(self.s3.head_object, Bucket=self.bucket_name, Key=file_key, ChecksumMode='ENABLED')
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'): return None
+            raise InternalServerError(detail=f"S3 head failed: {str(e)}")
+
+    async def download_to_file(self, file_key: str, path: str, max_bytes: int) -> int:
+        def download() -> int:
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=file_key)
+            if response['ContentLength'] > max_bytes:
+                response['Body'].close()
+                raise UnprocessableEntityException(detail="File is too large to process")
+            with open(path, "wb") as file:
+                for chunk in iter(lambda: response['Body'].read(STREAM_CHUNK_SIZE), b""): file.write(chunk)
+            return response['ContentLength']
+        try: return await self._run(download)
+        except ClientError as e: raise InternalServerError(detail=f"S3 download failed: {str(e)}")
+
+    async def hash_object(self, file_key: str) -> str:
+        def digest() -> str:
+            hasher, body = hashlib.sha256(), self.s3.get_object(Bucket=self.bucket_name, Key=file_key)['Body']
+            for chunk in iter(lambda: body.read(STREAM_CHUNK_SIZE), b""): hasher.update(chunk)
+            return hasher.hexdigest()
+        try: return await self._run(digest)
+        except ClientError as e: raise InternalServerError(detail=f"S3 download failed: {str(e)}")
+
+    def _read_range(self, file_key: str, offset: int, length: int) -> bytes:
+        return self.s3.get_object(Bucket=self.bucket_name, Key=file_key, Range=f"bytes={offset}-{offset + length - 1}")['Body'].read()
+
+    async def extract_metadata(self, file_key: str, size: int, mime_type: str) -> dict:
+        try: return await self._run(extract_media_metadata, partial(self._read_range, file_key), size, mime_type)
+        except ClientError: return {}
+
+    async def create_multipart_upload(self, file_key: str, content_type: str) -> str:
+        try: return (await self._run(self.s3.create_multipart_upload, Bucket=self.bucket_name, Key=file_key, ContentType=content_type, ChecksumAlgorithm='SHA256'))['UploadId']
+        except ClientError as e: raise InternalServerError(detail=f"S3 multipart upload failed: {str(e)}")
+
+    async def complete_multipart_upload(self, file_key: str, upload_id: str, parts: List[dict]) -> None:
+        try: await self._run(self.s3.complete_multipart_upload, Bucket=self.bucket_name, Key=file_key, UploadId=upload_id, MultipartUpload={'Parts': sorted(parts, key=lambda part: part['PartNumber'])})
+        except ClientError as e: raise BadRequestException(detail=f"Multipart upload could not be completed: {str(e)}")
+
+    async def abort_multipart_upload(self, file_key: str, upload_id: str) -> None:
+        try: await self._run(self.s3.abort_multipart_upload, Bucket=self.bucket_name, Key=file_key, UploadId=upload_id)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'NoSuchUpload': raise InternalServerError(detail=f"S3 abort failed: {str(e)}")
+
+    def generate_presigned_put_url(self, file_key: str, content_type: str, expires_in: int, checksum_sha256: Optional[str] = None) -> str:
+        params = {'Bucket': self.bucket_name, 'Key': file_key, 'ContentType': content_type}
+        if checksum_sha256: params['ChecksumSHA256'] = checksum_sha256
+        return self.s3.generate_presigned_url('put_object', Params=params, ExpiresIn=expires_in)
+
+    def generate_presigned_part_url(self, file_key: str, upload_id: str, part_number: int, expires_in: int) -> str:
+        return self.s3.generate_presigned_url('upload_part', Params={'Bucket': self.bucket_name, 'Key': file_key, 'UploadId': upload_id, 'PartNumber': part_number, 'ChecksumAlgorithm': 'SHA256'}, ExpiresIn=expires_in)
+
     def generate_presigned_url(self, file_key: str, expires_in: int = 3600) -> Optional[str]:
         try: return self.s3.generate_presigned_url('get_object', Params={'Bucket': self.bucket_name, 'Key': file_key}, ExpiresIn=expires_in)
         except ClientError: return None
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        self.s3.close()
@@ -0,0 +1,56 @@
+from typing import List, Optional
+from uuid import UUID
+from sqlalchemy import Text, case, cast, func, literal, literal_column, select, tuple_, union_all
+from sqlalchemy.dialects.postgresql import ARRAY, JSONPATH
+from sqlmodel.ext.asyncio.session import AsyncSession
+from exceptions import UnprocessableEntityException
+from models import SEARCH_CONFIG, Content, Document, Media
+from schemas.search_schema import SearchKindEnum, SearchOutSchema, SearchResultSchema
+from utils import decode_cursor, encode_cursor
+
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=24, MinWords=8, MaxFragments=2"
+CONTENT_STRINGS_PATH = 'strict $.** ? (@.type() == "string")'
+
+
+class SearchService:
+    def __init__(self):
+        self.models = {SearchKindEnum.content: Content, SearchKindEnum.media: Media, SearchKindEnum.document: Document}
+        self.search_config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+
+    def _content_text(self):
+        strings = func.jsonb_path_query(Content.data, cast(CONTENT_STRINGS_PATH, JSONPATH)).table_valued("value").render_derived()
+        data_text = select(func.string_agg(strings.c.value.op("#>>", return_type=Text)(literal([], ARRAY(Text))), " ")).scalar_subquery()
+        return func.concat_ws(" ", Content.name, data_text)
+
+    def _headline_sources(self) -> dict:
+        return {
+            SearchKindEnum.content: self._content_text(),
+            SearchKindEnum.media: func.concat_ws(" ", Media.name, Media.alt_text, Media.caption),
+            SearchKindEnum.document: func.concat_ws(" ", Document.name, Document.description, Document.author),
+        }
+
+    def _matches(self, kind: SearchKindEnum, app_id: UUID, query):
+        model = self.models[kind]
+        rank = func.ts_rank_cd(model.search_vector, query)
+        return select(literal(kind.value).label("kind"), model.id.label("id"), rank.label("rank")).where(model.app_id == str(app_id), model.search_vector.op("@@")(query))
+
+    async def search(self, app_id: UUID, q: str, session: AsyncSession, kinds: Optional[List[SearchKindEnum]] = None, limit: int = 20, cursor: Optional[str] = None) -> SearchOutSchema:
+        kinds = kinds or list(SearchKindEnum)
+        query = func.websearch_to_tsquery(self.search_config, q)
+        matches = union_all(*[self._matches(kind, app_id, query) for kind in kinds]).subquery("matches")
+        page = select(matches)
+        if cursor:
+            last_rank, last_id = decode_cursor(cursor, 2)
+            if isinstance(last_rank, bool) or not isinstance(last_rank, (int, float)) or not isinstance(last_id, str): raise UnprocessableEntityException(detail="Invalid cursor")
+            page = page.where(tuple_(matches.c.rank, matches.c.id) < tuple_(last_rank, last_id))
+        page = page.order_by(matches.c.rank.desc(), matches.c.id.desc()).limit(limit + 1).subquery("page")
+        statement = select(page.c.kind, page.c.id, page.c.rank)
+        for kind in kinds: statement = statement.outerjoin(self.models[kind], (page.c.kind == kind.value) & (self.models[kind].id == page.c.id))
+        sources = self._headline_sources()
+        name = case(*[(page.c.kind == kind.value, self.models[kind].name) for kind in kinds])
+        headline = func.ts_headline(self.search_config, case(*[(page.c.kind == kind.value, sources[kind]) for kind in kinds]), query, HEADLINE_OPTIONS)
+        statement = statement.add_columns(name.label("name"), headline.label("headline"))
+        result = await session.exec(statement.order_by(page.c.rank.desc(), page.c.id.desc()))
+        rows = result.mappings().all()
+        next_cursor = encode_cursor(rows[limit - 1]["rank"], rows[limit - 1]["id"]) if len(rows) > limit else None
+        return SearchOutSchema(items=[SearchResultSchema(**row) for row in rows[:limit]], next_cursor=next_cursor)
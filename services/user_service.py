@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import HTTPException
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
@@ -7,22 +9,26 @@ from models import Domain, Role, RoleEnum, User
 from schemas.user_schema import UserCreateSchema
 from passlib.context import CryptContext
 from services.roles_and_permission import RolesAndPermission
+from config import config
+
+password_executor = ThreadPoolExecutor(max_workers=config.PASSWORD_HASH_MAX_CONCURRENCY, thread_name_prefix="password-hash")
 
 
 class UserService:
     def __init__(self):
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        rounds = config.PASSWORD_HASH_ROUNDS
+        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds)
         self.roles_service = RolesAndPermission()
 
-    def __verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return self.pwd_context.verify(plain_password, hashed_password)
+    async def __verify_password(self, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        return await asyncio.get_running_loop().run_in_executor(password_executor, self.pwd_context.verify_and_update, plain_password, hashed_password)
 
-    def __hash_password(self, password: str) -> str:
-        return self.pwd_context.hash(password)
+    async def __hash_password(self, password: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(password_executor, self.pwd_context.hash, password)
 
     async def register_user(self, user_data: UserCreateSchema, session: AsyncSession):
         try:
-            hashed_password = self.__hash_password(user_data.password)
+            hashed_password = await self.__hash_password(user_data.password)
             new_user = User(**user_data.model_dump(exclude={"password", "domain"}), password=hashed_password)
             new_user.domain = Domain(name=user_data.domain.name, host=user_data.domain.host)
             role = await self.roles_service.get_role_by_name(RoleEnum.super_admin, session)
@@ -45,7 +51,12 @@ class UserService:
             if user_role_pair is None: raise UnauthorizedException("User not found")
             existing_user, role, domain = user_role_pair
             if existing_user is None: raise UnauthorizedException("User not found")
-            if not self.__verify_password(password, existing_user.password): raise UnauthorizedException("Wrong Password")
+            is_valid, new_hash = await self.__verify_password(password, existing_user.password)
+            if not is_valid: raise UnauthorizedException("Wrong Password")
+            if new_hash:
+                existing_user.password = new_hash
+                session.add(existing_user)
+                await session.commit()
             if existing_user.domain_id is None: raise NotFoundException("Domain not found, Please create one")
             return existing_user, role, domain
         except HTTPException as e:
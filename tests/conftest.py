@@ -0,0 +1,13 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for name, value in {"PROJECT_NAME": "test", "PROJECT_VERSION": "0", "PROJECT_DESCRIPTION": "test", "DATABASE_USER": "test", "DATABASE_NAME": "test", "DATABASE_HOST": "localhost", "DATABASE_PASS": "test", "JWT_SECRET": "test", "JWT_ALGORITHM": "HS256", "AWS_ACCESS_KEY": "test", "AWS_SECRET_KEY": "test", "AWS_REGION": "us-east-1", "S3_BUCKET_NAME": "test", "AWS_DIST_URL": "https://cdn.test"}.items(): os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def database_url():
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url: pytest.skip("TEST_DATABASE_URL is not set")
+    return url
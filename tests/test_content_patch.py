@@ -0,0 +1,48 @@
+import asyncio
+from uuid import uuid4
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import App, Content, Domain
+from schemas.conent_schema import JsonPatchOperationSchema
+from services.conent_service import ContentService
+
+
+async def patch_concurrently(url: str) -> tuple[dict, int]:
+    engine = create_async_engine(url)
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as connection: await connection.run_sync(SQLModel.metadata.create_all)
+    suffix = uuid4().hex[:12]
+    async with sessions() as session:
+        domain = Domain(name=suffix, host=f"{suffix}.test")
+        session.add(domain)
+        await session.flush()
+        app = App(name=suffix, slug=suffix, domain_id=domain.id)
+        session.add(app)
+        await session.flush()
+        content = Content(name="page", slug="page", path="page", data={"title": "page"}, app_id=app.id)
+        session.add(content)
+        await session.commit()
+    service = ContentService()
+    try:
+        async with sessions() as blocker, sessions() as first, sessions() as second:
+            await blocker.exec(select(Content.id).where(Content.id == content.id).with_for_update())
+            patches = [asyncio.create_task(service.patch_content(app.id, content.id, [JsonPatchOperationSchema(op="add", path=f"/{key}", value=key)], "json", session)) for key, session in (("first", first), ("second", second))]
+            await asyncio.sleep(0.2)
+            await blocker.commit()
+            await asyncio.gather(*patches)
+        async with sessions() as session:
+            stored = (await session.exec(select(Content.data, Content.version).where(Content.id == content.id))).one()
+            return stored.data, stored.version
+    finally:
+        async with sessions() as session:
+            await session.exec(delete(Domain).where(Domain.id == domain.id))
+            await session.commit()
+        await engine.dispose()
+
+
+def test_concurrent_patches_both_apply(database_url):
+    data, version = asyncio.run(patch_concurrently(database_url))
+    assert data == {"title": "page", "first": "first", "second": "second"}
+    assert version == 3
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from botocore.exceptions import ClientError
+from config import config
+from exceptions import InternalServerError
+from services.s3_service import S3Service
+
+PART_SIZE = 1024 * 1024
+CONCURRENCY = 4
+PARTS = 48
+
+
+class FakeStream:
+    def __init__(self, size: int):
+        self.remaining = size
+
+    async def read(self, size: int) -> bytes:
+        size = min(size, self.remaining)
+        self.remaining -= size
+        return bytes(size)
+
+
+class FakeClient:
+    def __init__(self, delay: float = 0.005, fail_part: int = None):
+        self.delay, self.fail_part = delay, fail_part
+        self.lock = threading.Lock()
+        self.in_flight = self.max_in_flight = 0
+        self.finished, self.events = [], []
+
+    def create_multipart_upload(self, **kwargs): return {"UploadId": "upload"}
+
+    def upload_part(self, PartNumber: int, Body: bytes, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+            self.finished.append(PartNumber)
+            self.events.append(("part", PartNumber))
+        if PartNumber == self.fail_part: raise ClientError({"Error": {"Code": "500", "Message": "failed"}}, "UploadPart")
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, **kwargs): self.events.append(("complete", kwargs["MultipartUpload"]["Parts"]))
+
+    def abort_multipart_upload(self, **kwargs):
+        with self.lock: self.events.append(("abort", self.in_flight))
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setattr(config, "S3_MULTIPART_PART_SIZE", PART_SIZE)
+    monkeypatch.setattr(config, "S3_MULTIPART_CONCURRENCY", CONCURRENCY)
+    service = S3Service.__new__(S3Service)
+    service.bucket_name = "test"
+    service.executor = ThreadPoolExecutor(max_workers=CONCURRENCY * 2)
+    yield service
+    service.executor.shutdown(wait=True)
+
+
+def test_upload_stream_memory_is_bounded_by_part_size_and_concurrency(s3):
+    s3.s3 = FakeClient()
+    tracemalloc.start()
+    try:
+        total = asyncio.run(s3.upload_stream("key", FakeStream(PART_SIZE * PARTS), "application/octet-stream"))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally: tracemalloc.stop()
+    assert total == PART_SIZE * PARTS
+    assert s3.s3.events[-1][0] == "complete"
+    assert [part["PartNumber"] for part in s3.s3.events[-1][1]] == list(range(1, PARTS + 1))
+    assert s3.s3.max_in_flight <= CONCURRENCY
+    assert peak < PART_SIZE * (CONCURRENCY + 2)
+
+
+def test_upload_stream_aborts_after_in_flight_parts_finish(s3):
+    s3.s3 = FakeClient(delay=0.05, fail_part=2)
+    with pytest.raises(InternalServerError): asyncio.run(s3.upload_stream("key", FakeStream(PART_SIZE * PARTS), "application/octet-stream"))
+    assert s3.s3.events[-1] == ("abort", 0)
+    assert ("part", 2) in s3.s3.events
+
+
+def test_cancelled_upload_stream_aborts_after_in_flight_parts_finish(s3):
+    s3.s3 = FakeClient(delay=0.05)
+
+    async def cancel_upload():
+        upload = asyncio.create_task(s3.upload_stream("key", FakeStream(PART_SIZE * PARTS), "application/octet-stream"))
+        while s3.s3.in_flight < CONCURRENCY: await asyncio.sleep(0.001)
+        upload.cancel()
+        with pytest.raises(asyncio.CancelledError): await upload
+        while not s3.s3.events or s3.s3.events[-1][0] != "abort": await asyncio.sleep(0.01)
+
+    asyncio.run(cancel_upload())
+    assert s3.s3.events[-1] == ("abort", 0)
+    assert len(s3.s3.finished) < PARTS
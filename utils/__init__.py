@@ -1,18 +1,28 @@
-from typing import Annotated
-from fastapi import Depends, Request
+import base64
+import binascii
+import hashlib
+import json
+import zlib
+from datetime import datetime
+from typing import Annotated, Any, AsyncIterator, Optional, Sequence
+from fastapi import Depends, Request, Response
 from httpx import AsyncClient
 from redis import Redis
 from config import config
-from jose import JWTError, jwt
-from exceptions import UnauthorizedException
+from jose import JWTError
+from exceptions import BadRequestException, UnauthorizedException
 from models import MediaTypeEnum
 from schemas.utils_schema import CurrentUser
+from services.auth_service import AuthService
+from services.s3_service import S3Service
 
 
-async def get_current_user(token: Annotated[str, Depends(config.AUTH_SCHEME)]):
+async def get_current_user(request: Request, token: Annotated[str, Depends(config.AUTH_SCHEME)]):
     try:
-        if not token: raise UnauthorizedException("Missing authentication token")
-        payload = jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
+        payload = getattr(request.state, "auth_claims", None)
+        if payload is None:
+            if not token: raise UnauthorizedException("Missing authentication token")
+            payload = await AuthService().verify_token(token, request.app.state.cache)
         user_id = payload.get("sub")
         user_role = payload.get("role")
         domain = payload.get("domain")
@@ -27,6 +37,10 @@ def get_http_client(request: Request) -> AsyncClient:
     return request.app.state.http_client
 
 
+def get_storage(request: Request) -> S3Service:
+    return request.app.state.storage
+
+
 def get_media_type(content_type: str) -> MediaTypeEnum:
     if content_type.startswith("image/"):
         return MediaTypeEnum.image
@@ -35,3 +49,55 @@ def get_media_type(content_type: str) -> MediaTypeEnum:
     elif content_type.startswith("audio/"):
         return MediaTypeEnum.audio
     return MediaTypeEnum.other
+
+
+def json_default(value: Any):
+    if isinstance(value, datetime): return value.isoformat()
+    return str(value)
+
+
+async def ndjson_stream(rows: AsyncIterator[dict], compress: bool = False, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    buffer = bytearray()
+    async for row in rows:
+        buffer += json.dumps(row, default=json_default, separators=(",", ":")).encode() + b"\n"
+        if len(buffer) < chunk_size: continue
+        chunk = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+        buffer.clear()
+        if chunk: yield chunk
+    tail = compressor.compress(bytes(buffer)) + compressor.flush() if compressor else bytes(buffer)
+    if tail: yield tail
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> tuple:
+    if not fields: return tuple(allowed)
+    selected = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    if unknown := set(selected) - set(allowed): raise BadRequestException(detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return selected or tuple(allowed)
+
+
+def encode_cursor(*values: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, default=json_default, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try: values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError): raise BadRequestException(detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size: raise BadRequestException(detail="Invalid cursor")
+    return values
+
+
+def make_etag(*values: Any) -> str:
+    return '"' + hashlib.sha256(json.dumps(values, default=json_default, separators=(",", ":")).encode()).hexdigest()[:32] + '"'
+
+
+def cache_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": config.HTTP_CACHE_CONTROL}
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match: return None
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in tags or etag in tags: return Response(status_code=304, headers=cache_headers(etag))
+    return None